@@ -1,240 +1,590 @@
+import functools
+import hmac
+import json
+import math
 import os
-from datetime import datetime
-from typing import List, Any, Dict, Optional
+import tempfile
+import time
+from typing import Any, List, Dict
 
 import numpy as np
-import pandas as pd
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 import tensorflow as tf
 
+from service.attention import AGGREGATE_MODES, predict_attention, summarize_attention, topk_batch, topk_lists
+from service.cache import ResultCache, tensor_key
+from service.executor import ExecutorSaturated, InferenceExecutor, configure_tf_threads
+from service.features import FEATURE_ORDER, WINDOW_MODES, transform_sequence, window_sequence
+from service.metrics import ServiceMetrics
+from service.profiling import RequestProfiler
+from service.incremental import PrefixIndex, SequenceScorer, score_with_prefix_cache
+from service.quantization import VARIANTS, TFLiteModel
+from service.registry import ModelBundle, ModelRegistry, RetryLoader, discover_versions
+from service.serialization import BASE64_ENCODING_NAME, ENCODINGS, NumpyJSONResponse, dumps, encode_probabilities
+from service.shadow import ShadowEvaluator
+
 # Model paths and runtime parameters
 MODEL_PATH = os.getenv("HELP_MODEL_PATH", "model/help_model.keras")
 ATTENTION_MODEL_PATH = os.getenv("HELP_ATTENTION_MODEL_PATH", "model/help_model_attention.keras")
 THRESHOLD = float(os.getenv("HELP_MODEL_THRESHOLD", "0.5"))
 ATTENTION_TOPK = int(os.getenv("HELP_ATTENTION_TOPK", "5"))
 
-# Exact order of expected input features (15, aligned with training)
-FEATURE_ORDER = [
-    "student_sex",
-    "student_mother_tongue",
-    "student_age",
-    "student_competence",
-    "exercise_skill_parallelism",
-    "exercise_skill_logical_thinking",
-    "exercise_skill_flow_control",
-    "exercise_skill_user_interactivity",
-    "exercise_skill_information_representation",
-    "exercise_skill_abstraction",
-    "exercise_skill_synchronization",
-    "exercise_level",
-    "solution_distance_total_distance",
-    "seconds_help_open",
-    "total_seconds",
-]
-
-# Columns related to APTED not used by the model
-APTED_COLUMNS = ["apted_distance", "tree_grade"]
-
-# Mapping from skill display names to feature columns
-SKILL_NAME_MAP = {
-    "Paralelismo": "exercise_skill_parallelism",
-    "Pensamiento lógico": "exercise_skill_logical_thinking",
-    "Control de flujo": "exercise_skill_flow_control",
-    "Interactividad con el usuario": "exercise_skill_user_interactivity",
-    "Representación de la información": "exercise_skill_information_representation",
-    "Abstracción": "exercise_skill_abstraction",
-    "Sincronización": "exercise_skill_synchronization",
-}
+# Model variant to serve: the original Keras model or a quantized TFLite artifact
+MODEL_VARIANT = os.getenv("HELP_MODEL_VARIANT", "keras")
+if MODEL_VARIANT not in VARIANTS:
+    raise ValueError(f"HELP_MODEL_VARIANT must be one of {VARIANTS}, got {MODEL_VARIANT!r}")
+QUANTIZED_MODEL_PATH = os.getenv("HELP_QUANTIZED_MODEL_PATH", f"model/help_model.{MODEL_VARIANT}.tflite")
+QUANTIZED_ATTENTION_MODEL_PATH = os.getenv(
+    "HELP_QUANTIZED_ATTENTION_MODEL_PATH", f"model/help_model_attention.{MODEL_VARIANT}.tflite")
+
+# Versioned models: one subdirectory per version holding files named like the paths above
+MODELS_DIR = os.getenv("HELP_MODELS_DIR", "")
+MODEL_POLL_INTERVAL = float(os.getenv("HELP_MODEL_POLL_INTERVAL", "30"))
+# Background retries of a failed model load: first delay, doubled after each failure up to the max
+MODEL_RETRY_BACKOFF = float(os.getenv("HELP_MODEL_RETRY_BACKOFF", "1"))
+MODEL_RETRY_BACKOFF_MAX = float(os.getenv("HELP_MODEL_RETRY_BACKOFF_MAX", "60"))
+
+# Shadow evaluation: a sampled fraction of scored requests is replayed on a candidate model
+SHADOW_MODEL_PATH = os.getenv("HELP_SHADOW_MODEL_PATH", "")
+SHADOW_SAMPLE_RATE = float(os.getenv("HELP_SHADOW_SAMPLE_RATE", "0.1")) if SHADOW_MODEL_PATH else 0.0
+SHADOW_QUEUE_SIZE = int(os.getenv("HELP_SHADOW_QUEUE_SIZE", "64"))
+
+# Bound on the history fed to the models: last K events or last K seconds of the session
+WINDOW_MODE = os.getenv("HELP_WINDOW_MODE", "none")
+if WINDOW_MODE not in WINDOW_MODES:
+    raise ValueError(f"HELP_WINDOW_MODE must be one of {WINDOW_MODES}, got {WINDOW_MODE!r}")
+WINDOW_SIZE = float(os.getenv("HELP_WINDOW_SIZE", "0"))
+if WINDOW_MODE == "events" and WINDOW_SIZE < 1:
+    raise ValueError(f"HELP_WINDOW_SIZE must be >= 1 with HELP_WINDOW_MODE=events, got {WINDOW_SIZE}")
+if WINDOW_MODE == "seconds" and not WINDOW_SIZE > 0:
+    raise ValueError(f"HELP_WINDOW_SIZE must be > 0 with HELP_WINDOW_MODE=seconds, got {WINDOW_SIZE}")
+WINDOW_SUMMARY = os.getenv("HELP_WINDOW_SUMMARY", "false").lower() in ("1", "true", "yes")
+
+# Inference concurrency: jobs running at once, jobs allowed to wait, and TF thread pools
+INFERENCE_WORKERS = int(os.getenv("HELP_INFERENCE_WORKERS", "1"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("HELP_INFERENCE_QUEUE_SIZE", "16"))
+INFERENCE_RETRY_AFTER = int(os.getenv("HELP_INFERENCE_RETRY_AFTER", "1"))
+TF_INTRA_OP_THREADS = int(os.getenv("HELP_TF_INTRA_OP_THREADS", "0"))
+TF_INTER_OP_THREADS = int(os.getenv("HELP_TF_INTER_OP_THREADS", "0"))
+
+# Result cache for repeated identical sessions (size bound in bytes, 0 disables it)
+RESULT_CACHE_BYTES = int(os.getenv("HELP_RESULT_CACHE_BYTES", str(32 * 1024 * 1024)))
+RESULT_CACHE_TTL = float(os.getenv("HELP_RESULT_CACHE_TTL", "30"))
+# Recently scored sessions kept for prefix reuse (0 disables it)
+PREFIX_CACHE_ENTRIES = int(os.getenv("HELP_PREFIX_CACHE_ENTRIES", "256"))
+
+# Batch attention endpoint: sessions per attention model call and cache of per-session summaries
+ATTENTION_BATCH_SIZE = int(os.getenv("HELP_ATTENTION_BATCH_SIZE", "64"))
+ATTENTION_CACHE_BYTES = int(os.getenv("HELP_ATTENTION_CACHE_BYTES", str(8 * 1024 * 1024)))
+ATTENTION_CACHE_TTL = float(os.getenv("HELP_ATTENTION_CACHE_TTL", "60"))
+
+# Prometheus-style metrics on /metrics
+METRICS_ENABLED = os.getenv("HELP_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Admin endpoints (/admin/*) are only served when a token is configured
+ADMIN_TOKEN = os.getenv("HELP_ADMIN_TOKEN", "")
+
+# Request profiling: requests sent with X-Help-Profile: <admin token>, plus a random sample
+PROFILE_SAMPLE_RATE = float(os.getenv("HELP_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_BUFFER_SIZE = int(os.getenv("HELP_PROFILE_BUFFER_SIZE", "20"))
+PROFILE_INTERVAL = float(os.getenv("HELP_PROFILE_INTERVAL", "0.005"))
+PROFILE_TF_DIR = os.getenv("HELP_PROFILE_TF_DIR", os.path.join(tempfile.gettempdir(), "help-profiles"))
 
 app = FastAPI(title="HelpModel WebService", version="1.0.0")
 
-# Load main model on startup
-try:
-    model = tf.keras.models.load_model(MODEL_PATH, compile=False, safe_mode=False)
-except Exception as e:
-    model = None
-    print(f"[ERROR] Failed to load main model on startup: {e}")
-
-# Load attention model on startup if present
-attention_model = None
-try:
-    if os.path.exists(ATTENTION_MODEL_PATH):
-        attention_model = tf.keras.models.load_model(ATTENTION_MODEL_PATH, compile=False, safe_mode=False)
-    else:
-        print("[INFO] Attention model not found; attention will be omitted in responses")
-except Exception as e:
-    attention_model = None
-    print(f"[WARN] Failed to load attention model: {e}")
+# Thread settings only apply if set before TensorFlow runs its first op
+configure_tf_threads(TF_INTRA_OP_THREADS, TF_INTER_OP_THREADS)
+inference_executor = InferenceExecutor(INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE, INFERENCE_RETRY_AFTER)
 
 
-@app.get("/health")
-def health():
-    status = "ok" if model is not None else "model_not_loaded"
-    att = "loaded" if attention_model is not None else "absent"
-    return {"status": status, "attention_model": att}
+result_cache = ResultCache(RESULT_CACHE_BYTES, RESULT_CACHE_TTL)
+prefix_index = PrefixIndex(PREFIX_CACHE_ENTRIES)
+attention_cache = ResultCache(ATTENTION_CACHE_BYTES, ATTENTION_CACHE_TTL)
+metrics = ServiceMetrics(METRICS_ENABLED)
+profiler = RequestProfiler(ADMIN_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_BUFFER_SIZE, PROFILE_INTERVAL, PROFILE_TF_DIR)
 
 
-def parse_datetime(dt_str: str) -> Optional[datetime]:
-    """Try to parse a datetime string with or without microseconds."""
-    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
+def _artifact_version(path: str) -> str:
+    """Identify a model artifact by file name and modification time."""
+    return f"{os.path.basename(path)}@{int(os.path.getmtime(path))}"
+
+
+def _load_model(keras_path: str, quantized_path: str, role: str):
+    """Load the configured variant of a model, falling back to the Keras model.
+
+    Returns the model, the name of the variant actually loaded and its version.
+    """
+    start = time.perf_counter()
+    if MODEL_VARIANT != "keras":
         try:
-            return datetime.strptime(dt_str, fmt)
-        except Exception:
-            continue
-    # Fallback with pandas (more flexible)
+            loaded = TFLiteModel(quantized_path, num_threads=TF_INTRA_OP_THREADS or None)
+            metrics.model_load.labels(role).set(time.perf_counter() - start)
+            return loaded, MODEL_VARIANT, _artifact_version(quantized_path)
+        except Exception as e:
+            print(f"[WARN] Failed to load {MODEL_VARIANT} model from {quantized_path}, using Keras model: {e}")
+    loaded = tf.keras.models.load_model(keras_path, compile=False, safe_mode=False)
+    metrics.model_load.labels(role).set(time.perf_counter() - start)
+    return loaded, "keras", _artifact_version(keras_path)
+
+
+def _build_scorer(loaded_model):
+    """Layer-by-layer scorer used for prefix reuse and uncached scoring, or None."""
     try:
-        return pd.to_datetime(dt_str).to_pydatetime()
-    except Exception:
+        return SequenceScorer.from_model(loaded_model)
+    except Exception as e:
+        print(f"[WARN] Prefix scoring unavailable for this model: {e}")
         return None
 
 
-def transform_sequence(payload: List[Dict[str, Any]]) -> np.ndarray:
-    """Transform a list of interaction objects into model-ready tensor of shape (1, T, F)."""
-    if not isinstance(payload, list) or len(payload) == 0:
-        raise ValueError("Body must be a non-empty array of interactions")
-
-    rows = []
-    # Ensure chronological order by dateTime
-    sorted_payload = sorted(payload, key=lambda x: x.get("dateTime", ""))
-
-    # Compute total_seconds relative to the first action timestamp
-    first_dt = None
-    for item in sorted_payload:
-        dt = parse_datetime(item.get("dateTime")) if item.get("dateTime") else None
-        if dt is not None:
-            first_dt = dt
-            break
-
-    for item in sorted_payload:
-        row = {col: 0.0 for col in FEATURE_ORDER}
-
-        # Student fields: gender -> sex; motherTongue, age, competence
-        student = item.get("student", {}) or {}
-        if "gender" in student:
-            row["student_sex"] = float(student.get("gender") or 0)
-        if "motherTongue" in student:
-            row["student_mother_tongue"] = float(student.get("motherTongue") or 0)
-        if "age" in student:
-            row["student_age"] = float(student.get("age") or 0)
-        if "competence" in student:
-            row["student_competence"] = float(student.get("competence") or 0)
-        # motivation is not used as a final feature
-
-        # Exercise: map skills and level
-        exercise = item.get("exercise", {}) or {}
-        skills = exercise.get("skills", []) or []
-        for s in skills:
-            name = s.get("name")
-            score = float(s.get("score") or 0.0)
-            col = SKILL_NAME_MAP.get(name)
-            if col:
-                row[col] = score
-        if "level" in exercise:
-            row["exercise_level"] = float(exercise.get("level") or 0)
-
-        # ARTIE distances: totalDistance
-        solution_distance = item.get("solutionDistance", {}) or {}
-        if "totalDistance" in solution_distance:
-            row["solution_distance_total_distance"] = float(solution_distance.get("totalDistance") or 0.0)
-
-        # seconds_help_open
-        if "secondsHelpOpen" in item:
-            row["seconds_help_open"] = float(item.get("secondsHelpOpen") or 0.0)
-
-        # total_seconds relative to the first action
-        current_dt = parse_datetime(item.get("dateTime")) if item.get("dateTime") else None
-        if first_dt is not None and current_dt is not None:
-            row["total_seconds"] = max(0.0, (current_dt - first_dt).total_seconds())
-        else:
-            row["total_seconds"] = 0.0
+def _model_paths(version: str):
+    """Main, quantized main, attention and quantized attention paths of a model version."""
+    paths = (MODEL_PATH, QUANTIZED_MODEL_PATH, ATTENTION_MODEL_PATH, QUANTIZED_ATTENTION_MODEL_PATH)
+    if not MODELS_DIR:
+        return paths
+    return tuple(os.path.join(MODELS_DIR, version, os.path.basename(p)) for p in paths)
+
+
+def _discover_versions() -> List[str]:
+    if MODELS_DIR:
+        return discover_versions(MODELS_DIR, os.path.basename(MODEL_PATH))
+    # Single model file: a new modification time is a new version
+    return [_artifact_version(MODEL_PATH)] if os.path.exists(MODEL_PATH) else []
+
+
+def _load_attention(bundle: ModelBundle) -> bool:
+    bundle.attention_model, bundle.attention_variant, bundle.attention_version = _load_model(
+        bundle.attention_path, bundle.quantized_attention_path, "attention")
+    return True
+
+
+def _load_bundle(version: str) -> ModelBundle:
+    keras_path, quantized_path, attention_path, quantized_attention_path = _model_paths(version)
+    loaded, variant, _ = _load_model(keras_path, quantized_path, "main")
+    bundle = ModelBundle(version, loaded, variant, _build_scorer(loaded), attention_path=attention_path,
+                         quantized_attention_path=quantized_attention_path)
+    # Attention model is optional; whether it exists is decided here, once per version
+    if not os.path.exists(attention_path):
+        print(f"[INFO] Attention model not found for version {version}; attention will be omitted")
+        return bundle
+    try:
+        _load_attention(bundle)
+    except Exception as e:
+        print(f"[WARN] Failed to load attention model for version {version}: {e}")
+        bundle.attention_loader = RetryLoader(functools.partial(_load_attention, bundle), MODEL_RETRY_BACKOFF,
+                                              MODEL_RETRY_BACKOFF_MAX, "attention-loader")
+        bundle.attention_loader.record_failure()
+    return bundle
+
+
+def _warm_up_inputs() -> List[np.ndarray]:
+    """Inputs of two lengths, so forward passes are traced for variable-length sequences."""
+    return [np.ones((1, length, len(FEATURE_ORDER)), dtype=np.float32) for length in (4, 16)]
+
+
+def _warm_up(bundle: ModelBundle) -> None:
+    """Trace the forward passes of a new bundle before it receives traffic."""
+    for X in _warm_up_inputs():
+        bundle.model.predict(X, verbose=0)
+        if bundle.scorer is not None:
+            bundle.scorer.score(X)
+        if bundle.attention_model is not None:
+            bundle.attention_model.predict(X, verbose=0)
+
+
+# Load the newest model version on startup, then watch for new ones in the background
+registry = ModelRegistry(_discover_versions, _load_bundle, _warm_up, MODEL_POLL_INTERVAL,
+                         MODEL_RETRY_BACKOFF, MODEL_RETRY_BACKOFF_MAX)
+registry.refresh()
+if registry.current is None:
+    print(f"[ERROR] Failed to load main model on startup: {registry.last_error}")
+registry.start()
+
+
+def _load_shadow_model():
+    """Candidate model for shadow evaluation, scored like the primary one."""
+    candidate = tf.keras.models.load_model(SHADOW_MODEL_PATH, compile=False, safe_mode=False)
+    scorer = _build_scorer(candidate)
+    if scorer is not None:
+        predict = lambda X: scorer.score(X)[0]
+    else:
+        predict = lambda X: candidate.predict(X, verbose=0).reshape(-1)
+    for X in _warm_up_inputs():
+        predict(X)
+    return predict, _artifact_version(SHADOW_MODEL_PATH)
+
+
+shadow = ShadowEvaluator(_load_shadow_model, SHADOW_SAMPLE_RATE, SHADOW_QUEUE_SIZE, THRESHOLD)
+shadow.start()
+
+
+@app.get("/health")
+def health():
+    bundle = registry.current
+    previous = registry.previous
+    status = "ok" if bundle is not None else "model_not_loaded"
+    att = "loaded" if bundle is not None and bundle.attention_model is not None else "absent"
+    return {"status": status, "attention_model": att,
+            "model_version": bundle.version if bundle is not None else None,
+            "previous_model_version": previous.version if previous is not None else None,
+            "model_variant": bundle.variant if bundle is not None else None,
+            "attention_variant": bundle.attention_variant if bundle is not None else None,
+            "model_loading": registry.loading, "inference_queue_depth": inference_executor.depth,
+            "result_cache": result_cache.stats(), "prefix_cache": prefix_index.stats(),
+            "attention_cache": attention_cache.stats()}
+
+
+def _cache_samples() -> Dict[tuple, float]:
+    samples = {}
+    for name, stats in (("result", result_cache.stats()), ("prefix", prefix_index.stats()),
+                        ("attention", attention_cache.stats())):
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                samples[(name, key)] = value
+    return samples
+
+
+metrics.registry.register_callback("help_cache", "Result, prefix and attention cache counters and sizes.", "gauge",
+                                   ("cache", "stat"), _cache_samples)
+metrics.registry.register_callback("help_inference_queue_depth", "Inference jobs running or waiting.", "gauge",
+                                   (), lambda: {(): inference_executor.depth})
+metrics.registry.register_callback(
+    "help_shadow", "Shadow evaluation counters of the candidate model.", "gauge", ("stat",),
+    lambda: {(k,): v for k, v in shadow.stats().items()
+             if k in ("sampled", "dropped", "queued", "compared", "errors", "disagreements")})
+metrics.registry.register_callback("help_model_info", "Active model version and variant.", "gauge",
+                                   ("version", "variant"),
+                                   lambda: {(b.version, b.variant): 1 for b in (registry.current,) if b is not None})
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def _require_admin(request: Request) -> None:
+    """Reject admin requests unless they carry the configured X-Admin-Token."""
+    token = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/admin/models")
+def list_models(request: Request):
+    _require_admin(request)
+    return registry.status()
+
+
+@app.post("/admin/models/reload")
+def reload_models(request: Request):
+    """Load the newest version now, retrying versions that failed before."""
+    _require_admin(request)
+    registry.refresh(retry_failed=True)
+    return registry.status()
+
+
+@app.post("/admin/models/rollback")
+def rollback_model(request: Request):
+    _require_admin(request)
+    try:
+        registry.rollback()
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return registry.status()
+
+
+@app.get("/admin/shadow")
+def shadow_stats(request: Request):
+    _require_admin(request)
+    return shadow.stats()
+
 
-        # Drop APTED-related columns if present (not part of FEATURE_ORDER)
-        for c in APTED_COLUMNS:
-            if c in row:
-                row.pop(c, None)
+@app.get("/admin/profiles")
+def list_profiles(request: Request):
+    _require_admin(request)
+    return {"profiles": profiler.list()}
 
-        # Keep the expected columns in fixed order
-        rows.append([row[c] for c in FEATURE_ORDER])
 
-    # Output shape (1, T, F)
-    X = np.array(rows, dtype=np.float32)
-    X = np.expand_dims(X, axis=0)
-    return X
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(profile_id: int, request: Request):
+    _require_admin(request)
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return profile
 
 
 def _topk_weights(w: np.ndarray, k: int) -> List[Dict[str, float]]:
     """Return the top-k attention weights as a list of {t, w}."""
     if w.size == 0:
         return []
-    k = max(1, min(k, w.size))
-    idx = np.argpartition(-w, k - 1)[:k]
-    idx = idx[np.argsort(-w[idx])]
-    return [{"t": int(i), "w": float(w[i])} for i in idx]
+    return topk_lists(*topk_batch(w[None, :], np.array([w.size]), k))[0]
 
 
-@app.post("/api/v1/help-model/predict")
-async def predict(request: Request):
-    global model, attention_model
-    if model is None:
-        # Retry loading if it failed on startup
-        try:
-            model = tf.keras.models.load_model(MODEL_PATH, compile=False, safe_mode=False)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Could not load main model: {e}")
+def _output_options(request: Request) -> Dict[str, Any]:
+    """Read the response format options from the query string."""
+    params = request.query_params
+    try:
+        include_sequence = params.get("include_sequence", "true").lower() not in ("0", "false", "no")
+        digits = int(params["round"]) if "round" in params else None
+        encoding = params.get("encoding", "json")
+        last_only = params.get("last_only", "false").lower() in ("1", "true", "yes")
+        if digits is not None and not 0 <= digits <= 17:
+            raise ValueError("round must be between 0 and 17")
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query parameter: {e}")
+    return {"include_sequence": include_sequence, "round": digits, "encoding": encoding, "last_only": last_only}
+
+
+def _run_prediction(bundle: ModelBundle, body: bytes, options: Dict[str, Any]) -> bytes:
+    """Blocking part of the predict endpoint; runs on the inference executor.
+
+    Returns the rendered response body.
+    """
 
     try:
-        payload = await request.json()
+        t0 = time.perf_counter()
+        payload = json.loads(body)
+        t1 = time.perf_counter()
         X = transform_sequence(payload)
+        X, dropped_events = window_sequence(X, WINDOW_MODE, WINDOW_SIZE, WINDOW_SUMMARY)
+        t2 = time.perf_counter()
+        metrics.stage["parse"].observe(t1 - t0)
+        metrics.stage["transform"].observe(t2 - t1)
+        metrics.sequence_length_child.observe(X.shape[1])
     except Exception as e:
+        metrics.error["invalid_input"].inc()
         raise HTTPException(status_code=400, detail=f"Invalid input: {e}")
 
+    # Identical sessions scored by the same models answer from the cache
+    cache_key = tensor_key(X, bundle.version, bundle.attention_version, THRESHOLD, ATTENTION_TOPK,
+                           options["include_sequence"], options["round"], options["encoding"], options["last_only"])
+    cached = result_cache.get(cache_key)
+    metrics.stage["cache"].observe(time.perf_counter() - t2)
+    if cached is not None:
+        return cached
+
     try:
         # Time-step prediction (model trained with return_sequences=True)
-        preds = model.predict(X, verbose=0).astype(float).reshape(-1)
+        t0 = time.perf_counter()
+        metrics.batch_size_child.observe(X.shape[0])
+        last_only = options["last_only"]
+        if prefix_index.enabled:
+            # Causal model: steps already scored for a shared prefix are reused
+            preds = score_with_prefix_cache(bundle.model, bundle.scorer, prefix_index, X, bundle.version, last_only)
+        elif bundle.scorer is not None:
+            # Without the per-call overhead of predict()
+            preds = bundle.scorer.score(X)[0]
+        else:
+            preds = bundle.model.predict(X, verbose=0).reshape(-1)
+        predict_latency = time.perf_counter() - t0
+        metrics.stage["predict"].observe(predict_latency)
         # Use the last probability as the current decision
         last_prob = float(preds[-1]) if preds.size > 0 else 0.0
         help_needed = bool(last_prob >= THRESHOLD)
+        shadow.submit(X, last_prob, predict_latency, bundle.version)
 
-        # Compute attention if the submodel is available
+        # Compute attention if the submodel is available (last-step-only requests skip it)
         attention = {"available": False}
-        if attention_model is None and os.path.exists(ATTENTION_MODEL_PATH):
-            try:
-                attention_model = tf.keras.models.load_model(ATTENTION_MODEL_PATH, compile=False, safe_mode=False)
-            except Exception as e:
-                attention_model = None
-                print(f"[WARN] On-demand attention model load failed: {e}")
+        if not last_only and bundle.attention_model is None and bundle.attention_loader is not None:
+            # Retried in the background; this response goes without attention
+            bundle.attention_loader.request()
 
-        if attention_model is not None:
+        attention_model = bundle.attention_model
+        if attention_model is not None and not last_only:
             try:
-                att = attention_model.predict(X, verbose=0)
-                # Normalize to shape (T,)
-                if att.ndim == 3 and att.shape[-1] == 1:
-                    att = att[0, :, 0]
-                elif att.ndim == 2:
-                    att = att[0, :]
-                else:
-                    att = np.array([], dtype=np.float32)
+                t0 = time.perf_counter()
+                weights, lengths = predict_attention(attention_model, [X])
                 attention = {
                     "available": True,
-                    "top_k": _topk_weights(att.astype(float), ATTENTION_TOPK),
-                    "seq_len": int(att.shape[0])
+                    "top_k": _topk_weights(weights[0, :lengths[0]], ATTENTION_TOPK),
+                    "seq_len": int(lengths[0])
                 }
+                metrics.stage["attention"].observe(time.perf_counter() - t0)
             except Exception as e:
                 print(f"[WARN] Failed to compute attention: {e}")
 
-        return {
+        if options["round"] is not None:
+            last_prob = round(last_prob, options["round"])
+        result = {
             "message": "OK",
             "body": {
                 "threshold": THRESHOLD,
                 "help_needed": help_needed,
                 "last_probability": last_prob,
-                "sequence_probabilities": preds.tolist(),
-                "attention": attention,
+                "model_version": bundle.version,
             }
         }
+        if not last_only:
+            result["body"]["attention"] = attention
+        if options["include_sequence"] and not last_only:
+            result["body"]["sequence_probabilities"] = encode_probabilities(preds, options["round"],
+                                                                            options["encoding"])
+            if options["encoding"] != "json":
+                result["body"]["sequence_encoding"] = BASE64_ENCODING_NAME
+        if WINDOW_MODE != "none":
+            # Step indices in the response refer to the windowed sequence
+            result["body"]["window"] = {"mode": WINDOW_MODE, "size": WINDOW_SIZE, "summary": WINDOW_SUMMARY,
+                                        "dropped_events": dropped_events}
     except Exception as e:
+        metrics.error["prediction_error"].inc()
         raise HTTPException(status_code=500, detail=f"Prediction error: {e}")
 
+    t0 = time.perf_counter()
+    rendered = dumps(result)
+    metrics.stage["serialize"].observe(time.perf_counter() - t0)
+
+    # Do not keep answers that lost their attention block to a transient failure
+    attention_expected = attention_model is not None or bundle.attention_loader is not None
+    if result_cache.enabled and (last_only or attention["available"] == attention_expected):
+        result_cache.put(cache_key, rendered, len(rendered))
+    return rendered
+
+
+def _active_bundle() -> ModelBundle:
+    """Bundle serving this request; it is read once, so a version swap does not affect it."""
+    bundle = registry.current
+    if bundle is None:
+        # One loader retries in the background; requests fail fast meanwhile
+        registry.request_load()
+        metrics.error["model_unavailable"].inc()
+        raise HTTPException(status_code=503, detail=f"Model is not loaded: {registry.last_error}",
+                            headers={"Retry-After": str(max(1, math.ceil(registry.retry_after)))})
+    return bundle
+
+
+async def _run_inference(fn, *args):
+    try:
+        return await inference_executor.run(fn, *args)
+    except ExecutorSaturated as e:
+        metrics.error["saturated"].inc()
+        raise HTTPException(status_code=503, detail="Inference queue is full, retry later",
+                            headers={"Retry-After": str(e.retry_after)})
+
+
+@app.post("/api/v1/help-model/predict", response_class=NumpyJSONResponse)
+async def predict(request: Request):
+    start = time.perf_counter()
+    status = 500
+    try:
+        options = _output_options(request)
+        bundle = _active_bundle()
+        body = await request.body()
+        reason = profiler.should_profile(request.headers.get("X-Help-Profile")) if profiler.enabled else None
+        if reason is None:
+            rendered = await _run_inference(_run_prediction, bundle, body, options)
+        else:
+            rendered = await _run_inference(profiler.run, reason, _run_prediction, bundle, body, options)
+        status = 200
+        return NumpyJSONResponse(rendered)
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        metrics.request("predict", status).inc()
+        metrics.predict_latency.observe(time.perf_counter() - start)
+
+
+def _attention_options(request: Request) -> Dict[str, Any]:
+    """Read the top-k and aggregation options of the batch attention endpoint."""
+    params = request.query_params
+    try:
+        k = int(params.get("top_k", ATTENTION_TOPK))
+        aggregate = params.get("aggregate", "none")
+        size = float(params.get("window_size", "0"))
+        if k < 1:
+            raise ValueError("top_k must be >= 1")
+        if aggregate not in AGGREGATE_MODES:
+            raise ValueError(f"aggregate must be one of {AGGREGATE_MODES}")
+        if aggregate != "none" and size <= 0:
+            raise ValueError("window_size must be > 0 when aggregating")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query parameter: {e}")
+    return {"top_k": k, "aggregate": aggregate, "window_size": size}
+
+
+def _summary_size(summary: Dict[str, Any]) -> int:
+    """Approximate memory held by a cached attention summary."""
+    windows = summary.get("windows")
+    return 200 + 120 * len(summary["top_k"]) + (24 * len(windows["mass"]) if windows else 0)
+
+
+def _run_attention(bundle: ModelBundle, body: bytes, options: Dict[str, Any]) -> bytes:
+    """Blocking part of the batch attention endpoint; runs on the inference executor."""
+    try:
+        t0 = time.perf_counter()
+        payload = json.loads(body)
+        if not isinstance(payload, list) or not all(isinstance(s, list) for s in payload):
+            raise ValueError("expected a JSON array of sessions, each a JSON array of interactions")
+        t1 = time.perf_counter()
+        tensors = [window_sequence(transform_sequence(s), WINDOW_MODE, WINDOW_SIZE, WINDOW_SUMMARY)[0]
+                   for s in payload]
+        metrics.stage["parse"].observe(t1 - t0)
+        metrics.stage["transform"].observe(time.perf_counter() - t1)
+    except Exception as e:
+        metrics.error["invalid_input"].inc()
+        raise HTTPException(status_code=400, detail=f"Invalid input: {e}")
+
+    attention_model = bundle.attention_model
+    if attention_model is None:
+        if bundle.attention_loader is not None:
+            bundle.attention_loader.request()
+        return dumps({"message": "OK", "body": {"model_version": bundle.version, "available": False}})
+
+    # Sessions unchanged since the last poll answer from the summary cache
+    t0 = time.perf_counter()
+    keys = [tensor_key(X, bundle.version, bundle.attention_version, options["top_k"], options["aggregate"],
+                       options["window_size"]) for X in tensors]
+    summaries = [attention_cache.get(key) for key in keys]
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    metrics.stage["cache"].observe(time.perf_counter() - t0)
+    if missing:
+        try:
+            t0 = time.perf_counter()
+            metrics.batch_size_child.observe(len(missing))
+            batch = [tensors[i] for i in missing]
+            weights, lengths = predict_attention(attention_model, batch, ATTENTION_BATCH_SIZE)
+            computed = summarize_attention(weights, lengths, batch, options["top_k"], options["aggregate"],
+                                           options["window_size"])
+            metrics.stage["attention"].observe(time.perf_counter() - t0)
+        except Exception as e:
+            metrics.error["prediction_error"].inc()
+            raise HTTPException(status_code=500, detail=f"Attention error: {e}")
+        for i, summary in zip(missing, computed):
+            summaries[i] = summary
+            attention_cache.put(keys[i], summary, _summary_size(summary))
+
+    t0 = time.perf_counter()
+    rendered = dumps({"message": "OK", "body": {"model_version": bundle.version, "available": True,
+                                                 "cached": len(tensors) - len(missing), "sessions": summaries}})
+    metrics.stage["serialize"].observe(time.perf_counter() - t0)
+    return rendered
+
+
+@app.post("/api/v1/help-model/attention", response_class=NumpyJSONResponse)
+async def attention_batch(request: Request):
+    start = time.perf_counter()
+    status = 500
+    try:
+        options = _attention_options(request)
+        bundle = _active_bundle()
+        body = await request.body()
+        rendered = await _run_inference(_run_attention, bundle, body, options)
+        status = 200
+        return NumpyJSONResponse(rendered)
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        metrics.request("attention", status).inc()
+        metrics.attention_latency.observe(time.perf_counter() - start)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app:app", host="0.0.0.0", port=8000)
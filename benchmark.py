@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmarks for the help model web service.
+
+    # Microbenchmarks of the feature pipeline and model forward passes
+    python benchmark.py micro --lengths 10 50 200 1000 --output bench-micro.json
+
+    # In-process load test of the FastAPI app with synthetic sessions
+    python benchmark.py load --concurrency 8 --requests 500 --lengths 20 100 --output bench-load.json
+
+    # Latency saved by last-step-only requests (?last_only=true) over full responses
+    python benchmark.py last-step --requests 200 --lengths 20 100 500 --output bench-last-step.json
+
+    # Offline scoring throughput with 1 to N worker processes (score_sessions.py)
+    python benchmark.py scaling --workers 1 2 4 8 16 32 --sessions 2000 --output bench-scaling.json
+
+    # Compare two result files (e.g. from two commits) and flag regressions
+    python benchmark.py compare bench-old.json bench-new.json --tolerance 0.10
+
+The models are loaded as the service does, so HELP_MODEL_PATH and the other HELP_*
+variables apply. Results are saved as JSON together with the commit and versions used.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+SKILL_NAMES = ["Paralelismo", "Pensamiento lógico", "Control de flujo", "Interactividad con el usuario",
+               "Representación de la información", "Abstracción", "Sincronización"]
+PREDICT_PATH = "/api/v1/help-model/predict"
+
+
+# Synthetic sessions following the request schema documented in the README
+def synthetic_session(n_events, rng, student_id=None):
+    student_id = student_id or f"bench-{rng.randrange(10 ** 9):09d}"
+    start = datetime(2021, 6, 8, 11, 0, 0)
+    student = {"_id": student_id, "gender": rng.randint(0, 1), "motherTongue": rng.randint(0, 2),
+               "age": rng.randint(8, 60), "competence": rng.randint(0, 3), "motivation": rng.randint(0, 3)}
+    skills = [{"name": name, "score": round(rng.random(), 2)} for name in SKILL_NAMES]
+    exercise = {"_id": "bench-exercise", "skills": skills, "validSolution": 0, "isEvaluation": True,
+                "level": rng.randint(1, 5)}
+    elapsed = 0.0
+    distance = rng.uniform(20, 120)
+    session = []
+    for _ in range(n_events):
+        elapsed += rng.expovariate(1 / 15.0)
+        distance = max(0.0, distance - rng.uniform(-2, 4))
+        session.append({
+            "student": student,
+            "exercise": exercise,
+            "solutionDistance": {"totalDistance": round(distance, 3)},
+            "dateTime": (start + timedelta(seconds=elapsed)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "secondsHelpOpen": round(rng.random() * 5, 2) if rng.random() < 0.1 else 0.0,
+            "finishedExercise": False,
+            "validSolution": 0,
+            "grade": rng.random(),
+            "lastLogin": "2021-06-08 11:00:00",
+            "aptedDistance": 0.0,
+        })
+    return session
+
+
+def run_metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except Exception:
+        commit = None
+    versions = {"python": platform.python_version(), "numpy": np.__version__}
+    for name in ("tensorflow", "pandas", "fastapi"):
+        try:
+            versions[name] = __import__(name).__version__
+        except Exception:
+            versions[name] = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+        "args": {k: v for k, v in vars(args).items() if k != "func"},
+    }
+
+
+def summarize(samples):
+    """Latency summary (seconds) of a list of samples."""
+    arr = np.asarray(samples, dtype=np.float64)
+    return {
+        "n": int(arr.size),
+        "mean": float(arr.mean()),
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+        "min": float(arr.min()),
+    }
+
+
+def time_call(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+# ---------------------------------------------------------------------------
+# Microbenchmarks
+# ---------------------------------------------------------------------------
+
+def micro(args):
+    import app as service
+    from service.attention import topk_batch, topk_lists
+    from service.features import parse_datetime, transform_sequence
+    from service.preprocess import data_transformation
+
+    rng = random.Random(args.seed)
+    results = []
+
+    def record(name, length, stats):
+        results.append({"name": name, "length": length, **stats})
+        print(f"{name:<28} T={length:<6} p50={stats['p50'] * 1e3:9.3f} ms  p95={stats['p95'] * 1e3:9.3f} ms")
+
+    record("parse_datetime", 1, time_call(lambda: parse_datetime("2021-06-08 11:08:36.121000"), args.repeat * 10))
+    for length in args.lengths:
+        session = synthetic_session(length, rng)
+        X = transform_sequence(session)
+        weights = np.random.default_rng(args.seed).random(length)
+
+        record("transform_sequence", length, time_call(lambda: transform_sequence(session), args.repeat))
+        record("_topk_weights", length, time_call(lambda: service._topk_weights(weights, service.ATTENTION_TOPK),
+                                                  args.repeat))
+        # Top-k of 64 sessions of this length at once, as the batch attention endpoint does
+        batch_weights = np.random.default_rng(args.seed).random((64, length))
+        batch_lengths = np.full(64, length)
+        record("topk_batch[N=64]", length,
+               time_call(lambda: topk_lists(*topk_batch(batch_weights, batch_lengths, service.ATTENTION_TOPK)),
+                         args.repeat))
+        # data_transformation mutates dateTime strings in place, so give it a fresh copy each time
+        record("data_transformation", length,
+               time_call(lambda: data_transformation(json.loads(json.dumps(session))), args.repeat))
+        bundle = service.registry.current
+        if bundle is not None:
+            record("model.predict", length, time_call(lambda: bundle.model.predict(X, verbose=0), args.repeat))
+            if bundle.scorer is not None:
+                record("SequenceScorer.score", length, time_call(lambda: bundle.scorer.score(X), args.repeat))
+            if bundle.attention_model is not None:
+                record("attention_model.predict", length,
+                       time_call(lambda: bundle.attention_model.predict(X, verbose=0), args.repeat))
+    return {"kind": "micro", "results": results}
+
+
+# ---------------------------------------------------------------------------
+# In-process load test
+# ---------------------------------------------------------------------------
+
+async def asgi_request(app, method, path, body=b""):
+    """Send one request straight to an ASGI app and return (status, response body)."""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # The client never disconnects
+        await asyncio.Event().wait()
+
+    status = None
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+async def drive(app, bodies, path, concurrency, total):
+    latencies = []
+    statuses = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < total:
+            body = bodies[next_index % len(bodies)]
+            next_index += 1
+            start = time.perf_counter()
+            status, _ = await asgi_request(app, "POST", path, body)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies, statuses, time.perf_counter() - start
+
+
+def load(args):
+    if args.no_cache:
+        # Must be set before the service reads its configuration
+        os.environ["HELP_RESULT_CACHE_BYTES"] = "0"
+        os.environ["HELP_PREFIX_CACHE_ENTRIES"] = "0"
+    import app as service
+
+    rng = random.Random(args.seed)
+    bodies = [json.dumps(synthetic_session(rng.choice(args.lengths), rng)).encode() for _ in range(args.pool)]
+    path = PREDICT_PATH + (f"?{args.query}" if args.query else "")
+
+    # Warm up tracing and caches of the model for every length
+    for length in sorted(set(args.lengths)):
+        asyncio.run(asgi_request(service.app, "POST", path, json.dumps(synthetic_session(length, rng)).encode()))
+
+    latencies, statuses, elapsed = asyncio.run(drive(service.app, bodies, path, args.concurrency, args.requests))
+    result = {
+        "kind": "load",
+        "concurrency": args.concurrency,
+        "requests": len(latencies),
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "latency": summarize(latencies),
+    }
+    lat = result["latency"]
+    print(f"{result['requests']} requests in {elapsed:.2f}s ({result['throughput']:.1f} req/s), "
+          f"p50={lat['p50'] * 1e3:.1f} ms p95={lat['p95'] * 1e3:.1f} ms p99={lat['p99'] * 1e3:.1f} ms, "
+          f"statuses={result['statuses']}")
+    return result
+
+
+def last_step(args):
+    # Every request must really be scored: both caches are disabled
+    os.environ["HELP_RESULT_CACHE_BYTES"] = "0"
+    os.environ["HELP_PREFIX_CACHE_ENTRIES"] = "0"
+    import app as service
+
+    rng = random.Random(args.seed)
+    modes = {"full": PREDICT_PATH, "last_only": PREDICT_PATH + "?last_only=true"}
+    results = []
+    for length in args.lengths:
+        bodies = [json.dumps(synthetic_session(length, rng)).encode() for _ in range(args.pool)]
+        row = {"name": "last_step", "length": length}
+        # Both modes score the main model the same way: the saving is the attention model and the response
+        for mode, path in modes.items():
+            asyncio.run(asgi_request(service.app, "POST", path, bodies[0]))
+            latencies, statuses, _ = asyncio.run(drive(service.app, bodies, path, 1, args.requests))
+            row[mode] = summarize(latencies)
+            row[f"{mode}_statuses"] = {str(k): v for k, v in sorted(statuses.items())}
+        row["p50"] = row["last_only"]["p50"]
+        row["saving_p50"] = 1 - row["last_only"]["p50"] / row["full"]["p50"]
+        row["saving_p95"] = 1 - row["last_only"]["p95"] / row["full"]["p95"]
+        print(f"T={length:<6} full p50={row['full']['p50'] * 1e3:8.2f} ms p95={row['full']['p95'] * 1e3:8.2f} ms  "
+              f"last_only p50={row['last_only']['p50'] * 1e3:8.2f} ms p95={row['last_only']['p95'] * 1e3:8.2f} ms  "
+              f"saving p50={row['saving_p50']:.1%} p95={row['saving_p95']:.1%}")
+        results.append(row)
+    return {"kind": "last_step", "results": results}
+
+
+# ---------------------------------------------------------------------------
+# Multi-process scaling
+# ---------------------------------------------------------------------------
+
+def scaling(args):
+    from service.features import transform_sequence
+    from service.parallel import ParallelScorer
+
+    rng = random.Random(args.seed)
+    tensors = [transform_sequence(synthetic_session(rng.choice(args.lengths), rng)) for _ in range(args.sessions)]
+    model_path = os.getenv("HELP_MODEL_PATH", "model/help_model.keras")
+    results = []
+    for workers in args.workers:
+        with ParallelScorer(model_path, workers, args.batch_size) as scorer:
+            start = time.perf_counter()
+            scorer.warm_up()
+            startup = time.perf_counter() - start
+            # First pass traces the model for the batch shapes
+            scorer.score(tensors)
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                scorer.score(tensors)
+                samples.append(time.perf_counter() - start)
+        stats = summarize(samples)
+        row = {"name": f"scaling[workers={workers}]", "workers": workers,
+               "intra_op_threads": scorer.intra_op_threads, "startup": startup,
+               "throughput": args.sessions / stats["p50"], **stats}
+        results.append(row)
+    base = results[0]["throughput"] / results[0]["workers"]
+    for row in results:
+        row["speedup"] = row["throughput"] / results[0]["throughput"]
+        row["efficiency"] = row["throughput"] / (base * row["workers"])
+        print(f"workers={row['workers']:<3} threads={row['intra_op_threads']:<3} p50={row['p50']:8.3f} s  "
+              f"{row['throughput']:9.1f} sessions/s  speedup={row['speedup']:5.2f}x  "
+              f"efficiency={row['efficiency']:6.1%}  startup={row['startup']:.1f} s")
+    return {"kind": "scaling", "sessions": args.sessions, "results": results}
+
+
+# ---------------------------------------------------------------------------
+# Comparison of saved results
+# ---------------------------------------------------------------------------
+
+def _keyed_latencies(report):
+    """Flatten a result file into {benchmark name: p50 latency}."""
+    if report["kind"] == "micro":
+        return {f"{r['name']}[T={r['length']}]": r["p50"] for r in report["results"]}
+    if report["kind"] == "load":
+        return {"load.p50": report["latency"]["p50"], "load.p95": report["latency"]["p95"],
+                "load.p99": report["latency"]["p99"]}
+    if report["kind"] == "last_step":
+        return {f"last_step.{mode}[T={r['length']}]": r[mode]["p50"] for r in report["results"]
+                for mode in ("full", "last_only")}
+    return {f"{r['name']}": r["p50"] for r in report.get("results", [])}
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    old = _keyed_latencies(baseline)
+    new = _keyed_latencies(candidate)
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>12} {'candidate':>12} {'change':>8}")
+    for name in sorted(set(old) & set(new)):
+        change = (new[name] - old[name]) / old[name] if old[name] else 0.0
+        flag = " REGRESSION" if change > args.tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<40} {old[name] * 1e3:10.3f}ms {new[name] * 1e3:10.3f}ms {change:>+8.1%}{flag}")
+    print(f"baseline {baseline['meta'].get('commit')} vs candidate {candidate['meta'].get('commit')}: "
+          f"{len(regressions)} regression(s) above {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("micro", help="Microbenchmarks of the feature pipeline and model forward passes")
+    p.add_argument("--lengths", type=int, nargs="+", default=[10, 50, 200, 1000])
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output")
+    p.set_defaults(func=micro)
+
+    p = sub.add_parser("load", help="Drive the FastAPI app in-process at a given concurrency")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--requests", type=int, default=200)
+    p.add_argument("--lengths", type=int, nargs="+", default=[20, 100])
+    p.add_argument("--pool", type=int, default=100, help="Distinct synthetic sessions to cycle through")
+    p.add_argument("--query", default="", help="Query string added to the predict URL")
+    p.add_argument("--no-cache", action="store_true", help="Disable the result and prefix caches")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output")
+    p.set_defaults(func=load)
+
+    p = sub.add_parser("last-step", help="Latency of last-step-only requests against full responses")
+    p.add_argument("--requests", type=int, default=100, help="Sequential requests per mode and length")
+    p.add_argument("--lengths", type=int, nargs="+", default=[20, 100, 500])
+    p.add_argument("--pool", type=int, default=20, help="Distinct synthetic sessions per length")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output")
+    p.set_defaults(func=last_step)
+
+    p = sub.add_parser("scaling", help="Offline scoring throughput from 1 to N worker processes")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--sessions", type=int, default=1000)
+    p.add_argument("--lengths", type=int, nargs="+", default=[10, 50, 200])
+    p.add_argument("--batch-size", type=int, default=64)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output")
+    p.set_defaults(func=scaling)
+
+    p = sub.add_parser("compare", help="Compare two saved result files")
+    p.add_argument("baseline")
+    p.add_argument("candidate")
+    p.add_argument("--tolerance", type=float, default=0.10, help="Relative p50 slowdown reported as regression")
+    p.set_defaults(func=compare)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = args.func(args)
+    if args.command == "compare":
+        return result
+    result["meta"] = run_metadata(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
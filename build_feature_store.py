@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Featurize exported sessions once into a memory-mapped feature store.
+
+Inputs are JSON exports (a JSON array of interactions, as accepted by
+``service.preprocess.data_transformation``) or JSONL files (one JSON array of
+interactions per line). Rows are grouped by session key (student, exercise and last
+login) and stored in the model feature order of ``model/selectedfeatures.csv``:
+
+    python build_feature_store.py --store features/ --input export-2024-05.json
+    # Later: only sessions whose key is not stored yet are added
+    python build_feature_store.py --store features/ --input export-2024-06.jsonl
+
+Read it back with ``service.feature_store.FeatureStore.open(path).get(key)``.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from service.feature_store import INDEX_FILE, FeatureStore, read_feature_order
+from service.preprocess import session_transformation
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", required=True, help="Feature store directory (created if missing)")
+    parser.add_argument("--input", nargs="+", required=True, help="JSON or JSONL export files")
+    parser.add_argument("--features", default="model/selectedfeatures.csv",
+                        help="CSV whose header gives the model feature order")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="JSONL lines featurized together (a session must not span chunks)")
+    parser.add_argument("--rebuild", action="store_true", help="Delete the existing store first")
+    return parser.parse_args(argv)
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[List[dict]]:
+    """Interactions of an export, in chunks of JSONL lines (a JSON file is a single chunk)."""
+    if not path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError(f"{path}: expected a JSON array of interactions")
+        yield data
+        return
+    chunk = []
+    lines = 0
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            session = json.loads(line)
+            if not isinstance(session, list):
+                raise ValueError(f"{path}:{line_no}: expected a JSON array of interactions")
+            chunk.extend(session)
+            lines += 1
+            if lines == chunk_size:
+                yield chunk
+                chunk, lines = [], 0
+    if chunk:
+        yield chunk
+
+
+def featurize(interactions: List[dict], features: List[str]) -> List[Tuple[str, np.ndarray]]:
+    """(session key, (T, F) float32 rows) of every session, in order of first appearance."""
+    df, keys = session_transformation(interactions)
+    if len(df) == 0:
+        return []
+    missing = [c for c in features if c not in df.columns]
+    if missing:
+        raise ValueError(f"Features not produced by the preprocessing: {missing}")
+    values = df[features].to_numpy(dtype=np.float32, na_value=np.nan)
+    positions: Dict[str, List[int]] = {}
+    for position, key in enumerate(keys):
+        positions.setdefault(key, []).append(position)
+    return [(key, values[rows]) for key, rows in positions.items()]
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    features = read_feature_order(args.features)
+    if args.rebuild and os.path.isdir(args.store):
+        shutil.rmtree(args.store)
+    if os.path.exists(os.path.join(args.store, INDEX_FILE)):
+        store = FeatureStore.open(args.store)
+        if store.features != features:
+            print(f"[ERROR] {args.store} stores features {store.features}, expected {features}; use --rebuild")
+            return 1
+    else:
+        store = FeatureStore.create(args.store, features)
+
+    start = time.perf_counter()
+    added = skipped = 0
+    for path in args.input:
+        for chunk in read_chunks(path, args.chunk_size):
+            a, s = store.append(featurize(chunk, features))
+            added += a
+            skipped += s
+        print(f"{path}: {len(store)} sessions, {store.data.shape[0]} rows stored")
+    elapsed = time.perf_counter() - start
+    size = store.data.nbytes
+    print(f"Added {added} sessions, skipped {skipped} already stored, in {elapsed:.2f}s "
+          f"({size / 1024 / 1024:.1f} MiB of rows, {len(features)} features)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
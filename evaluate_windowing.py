@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Measure how much windowing the session history changes the help decision.
+
+Every session of a JSONL file (one JSON array of interactions per line) is scored with
+its full history and with each window size; the drift of ``last_probability``, the
+``help_needed`` flip rate and the time steps saved are reported per window size:
+
+    python evaluate_windowing.py --sessions sessions.jsonl --mode events --sizes 20 50 100 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from service.features import read_sessions, transform_sequence, window_sequence
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", required=True, help="JSONL file with one session per line")
+    parser.add_argument("--mode", choices=["events", "seconds"], default="events")
+    parser.add_argument("--sizes", type=float, nargs="+", required=True,
+                        help="Window sizes to evaluate (events or seconds, depending on --mode)")
+    parser.add_argument("--summary", action="store_true", help="Prepend the summarised earlier context row")
+    parser.add_argument("--model", default=os.getenv("HELP_MODEL_PATH", "model/help_model.keras"))
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("HELP_MODEL_THRESHOLD", "0.5")))
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def last_probability(model, X):
+    """Score a (1, T, F) tensor and return the probability of its last step and the elapsed time."""
+    start = time.perf_counter()
+    preds = model.predict(X, verbose=0).reshape(-1)
+    return float(preds[-1]), time.perf_counter() - start
+
+
+def evaluate(model, tensors, mode, sizes, summary, threshold):
+    # Warm up so tracing does not count against the full-history timings
+    model.predict(tensors[0], verbose=0)
+    full = [last_probability(model, X) for X in tensors]
+    full_steps = sum(X.shape[1] for X in tensors)
+    full_time = sum(t for _, t in full)
+
+    results = []
+    for size in sizes:
+        drifts = []
+        flips = 0
+        steps = 0
+        elapsed = 0.0
+        windowed_sessions = 0
+        for X, (ref, _) in zip(tensors, full):
+            Xw, dropped = window_sequence(X, mode, size, summary)
+            prob, t = last_probability(model, Xw)
+            drifts.append(abs(prob - ref))
+            flips += int((prob >= threshold) != (ref >= threshold))
+            steps += Xw.shape[1]
+            elapsed += t
+            windowed_sessions += int(dropped > 0)
+        drifts = np.asarray(drifts)
+        results.append({
+            "size": size,
+            "windowed_sessions": windowed_sessions,
+            "mean_drift": float(drifts.mean()),
+            "p95_drift": float(np.percentile(drifts, 95)),
+            "max_drift": float(drifts.max()),
+            "flip_rate": flips / len(tensors),
+            "steps_ratio": steps / full_steps,
+            "time_ratio": elapsed / full_time if full_time else 0.0,
+        })
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    invalid = [size for size in args.sizes if (size < 1 if args.mode == "events" else not size > 0)]
+    if invalid:
+        print(f"[ERROR] Invalid {args.mode} window sizes {invalid}: must be >= 1 event or > 0 seconds")
+        return 1
+    tensors = [transform_sequence(s) for s in read_sessions(args.sessions)]
+    if not tensors:
+        print(f"[ERROR] No sessions found in {args.sessions}")
+        return 1
+    model = tf.keras.models.load_model(args.model, compile=False, safe_mode=False)
+
+    lengths = np.asarray([X.shape[1] for X in tensors])
+    report = {
+        "sessions": len(tensors),
+        "length": {"mean": float(lengths.mean()), "p95": float(np.percentile(lengths, 95)),
+                   "max": int(lengths.max())},
+        "mode": args.mode,
+        "summary": args.summary,
+        "threshold": args.threshold,
+        "windows": evaluate(model, tensors, args.mode, args.sizes, args.summary, args.threshold),
+    }
+
+    print(f"{'size':>10} {'windowed':>9} {'mean':>9} {'p95':>9} {'max':>9} {'flips':>7} {'steps':>7} {'time':>7}")
+    for r in report["windows"]:
+        print(f"{r['size']:>10g} {r['windowed_sessions']:>9d} {r['mean_drift']:>9.5f} {r['p95_drift']:>9.5f} "
+              f"{r['max_drift']:>9.5f} {r['flip_rate']:>7.2%} {r['steps_ratio']:>7.2%} {r['time_ratio']:>7.2%}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
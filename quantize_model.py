@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Quantize the help model (and the attention model, if present) to TFLite for CPU-only pods.
+
+The quantized artifact is only written when it stays within the accuracy guardrails
+measured on a calibration set of sessions (JSONL, one JSON array of interactions per line):
+
+    python quantize_model.py --variant int8 --calibration sessions.jsonl
+
+Serve it with HELP_MODEL_VARIANT=int8 (see README).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import tensorflow as tf
+
+from service.features import read_sessions, transform_sequence
+from service.quantization import TFLiteModel, compare_models, quantize_model
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variant", choices=["float16", "int8"], required=True)
+    parser.add_argument("--calibration", required=True, help="JSONL file with one session per line")
+    parser.add_argument("--model", default=os.getenv("HELP_MODEL_PATH", "model/help_model.keras"))
+    parser.add_argument("--attention-model",
+                        default=os.getenv("HELP_ATTENTION_MODEL_PATH", "model/help_model_attention.keras"))
+    parser.add_argument("--output", help="Quantized main model path (default model/help_model.<variant>.tflite)")
+    parser.add_argument("--attention-output",
+                        help="Quantized attention model path (default model/help_model_attention.<variant>.tflite)")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("HELP_MODEL_THRESHOLD", "0.5")))
+    parser.add_argument("--max-deviation", type=float, default=0.05,
+                        help="Maximum allowed absolute deviation of any sequence probability")
+    parser.add_argument("--max-flip-rate", type=float, default=0.01,
+                        help="Maximum allowed fraction of sessions whose help_needed flips")
+    parser.add_argument("--max-attention-deviation", type=float,
+                        help="Maximum allowed absolute deviation of any attention weight (default: --max-deviation)")
+    parser.add_argument("--force", action="store_true", help="Write the artifacts even if a guardrail fails")
+    return parser.parse_args(argv)
+
+
+def quantize_and_check(model_path, output_path, variant, tensors, threshold):
+    """Quantize one model, reload the artifact from a temp file and compare it with the original."""
+    model = tf.keras.models.load_model(model_path, compile=False, safe_mode=False)
+    flatbuffer = quantize_model(model, variant, tensors)
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(flatbuffer)
+    report = compare_models(model, TFLiteModel(tmp_path), tensors, threshold)
+    report.update({"source": model_path, "output": output_path, "size_bytes": len(flatbuffer)})
+    return tmp_path, report
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = args.output or f"model/help_model.{args.variant}.tflite"
+    attention_output = args.attention_output or f"model/help_model_attention.{args.variant}.tflite"
+
+    sessions = read_sessions(args.calibration)
+    tensors = [transform_sequence(s) for s in sessions]
+    print(f"Loaded {len(tensors)} calibration sessions from {args.calibration}")
+
+    pending = []
+    report = {"variant": args.variant, "calibration": args.calibration}
+
+    max_attention_deviation = args.max_attention_deviation
+    if max_attention_deviation is None:
+        max_attention_deviation = args.max_deviation
+
+    tmp_path, report["model"] = quantize_and_check(args.model, output, args.variant, tensors, args.threshold)
+    pending.append((tmp_path, output))
+    failures = []
+    if report["model"]["max_deviation"] > args.max_deviation:
+        failures.append(f"max_deviation {report['model']['max_deviation']:.6f} > {args.max_deviation}")
+    if report["model"]["flip_rate"] > args.max_flip_rate:
+        failures.append(f"flip_rate {report['model']['flip_rate']:.4f} > {args.max_flip_rate}")
+
+    if os.path.exists(args.attention_model):
+        tmp_path, report["attention_model"] = quantize_and_check(
+            args.attention_model, attention_output, args.variant, tensors, args.threshold)
+        # help_needed is not meaningful for attention weights, only the deviation is reported
+        report["attention_model"].pop("flip_rate", None)
+        pending.append((tmp_path, attention_output))
+        deviation = report["attention_model"]["max_deviation"]
+        if deviation > max_attention_deviation:
+            failures.append(f"attention max_deviation {deviation:.6f} > {max_attention_deviation}")
+    else:
+        print(f"[INFO] Attention model not found at {args.attention_model}; skipping")
+
+    report["guardrails"] = {
+        "max_deviation": args.max_deviation,
+        "max_flip_rate": args.max_flip_rate,
+        "max_attention_deviation": max_attention_deviation,
+        "passed": not failures,
+        "failures": failures,
+    }
+    print(json.dumps(report, indent=2))
+
+    if failures and not args.force:
+        for tmp_path, _ in pending:
+            os.remove(tmp_path)
+        print("[ERROR] Guardrails failed; quantized artifacts were not written")
+        return 1
+
+    for tmp_path, final_path in pending:
+        os.replace(tmp_path, final_path)
+        print(f"Wrote {final_path}")
+    with open(output + ".report.json", "w") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Score many sessions in parallel on all cores.
+
+Sessions come from a feature store built by build_feature_store.py or from a JSONL file
+(one JSON array of interactions per line). They are scored by a pool of processes, each
+loading the model once, and written as JSONL in input order:
+
+    python score_sessions.py --store features/ --workers 8 --output scores.jsonl
+    python score_sessions.py --sessions sessions.jsonl --output scores.jsonl --include-sequence
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from service.parallel import ParallelScorer
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--store", help="Feature store directory")
+    source.add_argument("--sessions", help="JSONL file with one session per line")
+    parser.add_argument("--output", required=True, help="JSONL file with one result per session")
+    parser.add_argument("--model", default=os.getenv("HELP_MODEL_PATH", "model/help_model.keras"))
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("HELP_MODEL_THRESHOLD", "0.5")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=64, help="Sessions per model call")
+    parser.add_argument("--intra-op-threads", type=int, default=0,
+                        help="TensorFlow threads per worker (default: cores / workers)")
+    parser.add_argument("--inter-op-threads", type=int, default=1)
+    parser.add_argument("--include-sequence", action="store_true", help="Also write sequence_probabilities")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.store:
+        scorer = ParallelScorer(args.model, args.workers, args.batch_size, args.intra_op_threads,
+                                args.inter_op_threads, store_path=args.store)
+        keys = scorer.store.keys()
+        items = keys
+    else:
+        from service.features import read_sessions, transform_sequence
+        from service.preprocess import get_session_key
+        sessions = [s for s in read_sessions(args.sessions) if s]
+        keys = [get_session_key(s[0]) for s in sessions]
+        items = [transform_sequence(s) for s in sessions]
+        scorer = ParallelScorer(args.model, args.workers, args.batch_size, args.intra_op_threads,
+                                args.inter_op_threads)
+    if not items:
+        print("[ERROR] No sessions to score")
+        scorer.close()
+        return 1
+
+    with scorer:
+        start = time.perf_counter()
+        scorer.warm_up()
+        startup = time.perf_counter() - start
+        start = time.perf_counter()
+        results = scorer.score(items, include_sequence=args.include_sequence)
+        elapsed = time.perf_counter() - start
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        for key, result in zip(keys, results):
+            last = float(result[-1]) if args.include_sequence else result
+            row = {"key": key, "last_probability": last, "help_needed": last >= args.threshold}
+            if args.include_sequence:
+                row["sequence_probabilities"] = result.tolist()
+            f.write(json.dumps(row) + "\n")
+    print(f"Scored {len(items)} sessions with {scorer.workers} workers "
+          f"({scorer.intra_op_threads} TF threads each) in {elapsed:.2f}s after {startup:.2f}s of startup "
+          f"({len(items) / elapsed:.1f} sessions/s); wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Batched post-processing of attention weights.
+
+Weights of N sessions are held in a right-padded (N, T) matrix together with the
+length of each session; padded steps never appear in the top-k nor in aggregates.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from service.batching import predict_steps
+from service.features import FEATURE_ORDER
+
+AGGREGATE_MODES = ("none", "events", "seconds")
+
+
+def predict_attention(model, tensors: List[np.ndarray], batch_size: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+    """Attention weights of (1, T_i, F) tensors as a padded (N, T_max) matrix and lengths (N,)."""
+    return predict_steps(model, tensors, batch_size)
+
+
+def topk_batch(weights: np.ndarray, lengths: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Top-k steps of every row of a padded (N, T) matrix with one ``argpartition``.
+
+    Returns the step indices and weights (N, k'), sorted by decreasing weight, and the
+    number of valid entries per row (rows shorter than k' are padded with -1 / 0).
+    """
+    N, T = weights.shape
+    k = max(1, min(k, T)) if T else 0
+    counts = np.minimum(lengths, k)
+    if k == 0:
+        return np.zeros((N, 0), dtype=np.int64), np.zeros((N, 0), dtype=np.float64), counts
+    valid = np.arange(T)[None, :] < lengths[:, None]
+    masked = np.where(valid, weights.astype(np.float64), -np.inf)
+    idx = np.argpartition(-masked, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(masked, idx, axis=1)
+    order = np.argsort(-top, axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    filled = np.arange(k)[None, :] < counts[:, None]
+    return np.where(filled, idx, -1), np.where(filled, top, 0.0), counts
+
+
+def topk_lists(idx: np.ndarray, top: np.ndarray, counts: np.ndarray) -> List[List[Dict[str, float]]]:
+    """Per-row top-k as lists of {t, w}, the format of the predict response."""
+    return [[{"t": int(t), "w": float(w)} for t, w in zip(idx[i, :n].tolist(), top[i, :n].tolist())]
+            for i, n in enumerate(counts.tolist())]
+
+
+def window_mass(weights: np.ndarray, lengths: np.ndarray, mode: str, size: float,
+                times: Optional[np.ndarray] = None) -> List[List[float]]:
+    """Attention mass per time window, most recent window first.
+
+    ``events`` windows hold ``size`` steps counted back from the last one; ``seconds``
+    windows cover ``size`` seconds before the last step, using ``times`` (N, T), the
+    ``total_seconds`` of every step.
+    """
+    N, T = weights.shape
+    steps = np.arange(T)[None, :]
+    valid = steps < lengths[:, None]
+    if mode == "events":
+        buckets = (lengths[:, None] - 1 - steps) // max(1, int(size))
+    elif mode == "seconds":
+        last = np.take_along_axis(times, np.maximum(lengths - 1, 0)[:, None], axis=1)
+        age = np.nan_to_num(last - times, nan=0.0)
+        buckets = np.floor(np.maximum(age, 0.0) / size).astype(np.int64)
+    else:
+        raise ValueError(f"mode must be one of {AGGREGATE_MODES[1:]}, got {mode!r}")
+    buckets = np.where(valid, buckets, 0)
+    n_buckets = int(buckets.max()) + 1 if N and T else 0
+    flat = (np.arange(N)[:, None] * n_buckets + buckets)[valid]
+    mass = np.bincount(flat, weights=weights[valid], minlength=N * n_buckets).reshape(N, n_buckets)
+    used = [int(buckets[i, :lengths[i]].max()) + 1 if lengths[i] else 0 for i in range(N)]
+    return [mass[i, :used[i]].tolist() for i in range(N)]
+
+
+def summarize_attention(weights: np.ndarray, lengths: np.ndarray, tensors: List[np.ndarray], k: int,
+                        mode: str = "none", size: float = 0.0) -> List[Dict[str, Any]]:
+    """Top-k steps and, optionally, attention mass per time window of every session."""
+    idx, top, counts = topk_batch(weights, lengths, k)
+    summaries = [{"seq_len": int(n), "top_k": top_k} for n, top_k in zip(lengths, topk_lists(idx, top, counts))]
+    if mode != "none":
+        times = None
+        if mode == "seconds":
+            column = FEATURE_ORDER.index("total_seconds")
+            times = np.zeros(weights.shape, dtype=np.float64)
+            for i, X in enumerate(tensors):
+                n = int(lengths[i])
+                times[i, :n] = X[0, :n, column]
+        for summary, mass in zip(summaries, window_mass(weights, lengths, mode, size, times)):
+            summary["windows"] = {"mode": mode, "size": size, "mass": mass}
+    return summaries
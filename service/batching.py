@@ -0,0 +1,51 @@
+"""Batched scoring of variable-length sessions by models with one output per time step."""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from service.features import pad_batch
+
+
+def _normalize(out: np.ndarray, n: int) -> np.ndarray:
+    """Model output (n, T) or (n, T, 1) as an (n, T) matrix."""
+    out = np.asarray(out)
+    if out.ndim == 3 and out.shape[-1] == 1:
+        return out[:, :, 0]
+    if out.ndim == 2:
+        return out
+    return np.zeros((n, 0), dtype=np.float32)
+
+
+def predict_steps(model, tensors: List[np.ndarray], batch_size: int = 64,
+                  pad: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-step outputs of (1, T_i, F) tensors as a padded (N, T_max) matrix and lengths (N,).
+
+    Sessions are batched by identical length: padding can change the outputs of real
+    steps, e.g. of the attention softmax over time, whose mask treats any non-zero
+    padding as valid steps. With ``pad``, for causal models whose output at a step does
+    not depend on later steps, sessions of similar length are right-padded into batches
+    of up to ``batch_size`` instead. Models that only accept a fixed batch size
+    (``max_batch_size``, e.g. ``TFLiteModel``) get batches of at most that size.
+    """
+    # Quantized artifacts are exported with a fixed batch dimension of 1
+    batch_size = min(batch_size, getattr(model, "max_batch_size", None) or batch_size)
+    lengths = np.array([X.shape[1] for X in tensors], dtype=np.int64)
+    outputs = np.zeros((len(tensors), int(lengths.max()) if len(tensors) else 0), dtype=np.float32)
+    if pad:
+        # Similar lengths together keep padding small
+        order = np.argsort(lengths, kind="stable")
+        groups = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    else:
+        groups = []
+        for length in np.unique(lengths):
+            same = np.flatnonzero(lengths == length)
+            groups.extend(same[i:i + batch_size] for i in range(0, len(same), batch_size))
+    for group in groups:
+        X, group_lengths = pad_batch([tensors[i] for i in group])
+        out = _normalize(model.predict(X, verbose=0), len(group))
+        for row, i in enumerate(group):
+            n = min(int(group_lengths[row]), out.shape[1])
+            outputs[i, :n] = out[row, :n]
+            lengths[i] = n
+    return outputs, lengths
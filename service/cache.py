@@ -0,0 +1,97 @@
+"""Content-addressed LRU/TTL cache for prediction results."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def tensor_key(X: np.ndarray, *parts: Any) -> str:
+    """Hash a feature tensor (shape, dtype and raw bytes) together with extra key parts."""
+    X = np.ascontiguousarray(X)
+    h = hashlib.sha256()
+    h.update(f"{X.shape}|{X.dtype.str}|".encode())
+    h.update(X.data)
+    for part in parts:
+        h.update(b"|")
+        h.update(repr(part).encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds.
+
+    The total size of the cached values (as reported by the caller on ``put``) is kept
+    under ``max_bytes`` by evicting the least recently used entries. ``max_bytes <= 0``
+    disables the cache.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = item
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any, size: int) -> None:
+        # Entries larger than the whole cache would only flush everything else
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._items.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,73 @@
+"""Bounded thread pool that keeps blocking inference off the asyncio event loop."""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import tensorflow as tf
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the executor already holds as many jobs as it is allowed to queue."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference executor is saturated")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """Run blocking calls on a dedicated pool with a bound on running + queued jobs.
+
+    ``max_workers`` jobs run concurrently and up to ``max_queue`` more wait for a
+    worker; any job beyond that is rejected immediately with ``ExecutorSaturated``
+    so latency stays predictable under overload instead of growing with the backlog.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue: int = 16, retry_after: int = 1):
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+        self.max_workers = max_workers
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs currently running or waiting for a worker."""
+        return self._pending
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise ExecutorSaturated(self.retry_after)
+            self._pending += 1
+        # The slot is released when the job really finishes, not when the awaiting
+        # request goes away, so cancelled requests cannot over-admit new work
+        future = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def configure_tf_threads(intra_op: int = 0, inter_op: int = 0) -> None:
+    """Set TensorFlow's intra/inter-op thread pools (0 keeps TF's default).
+
+    Must run before TensorFlow executes any op, i.e. before loading a model.
+    """
+    try:
+        if intra_op > 0:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+        if inter_op > 0:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+    except RuntimeError as e:
+        print(f"[WARN] Could not configure TensorFlow threads: {e}")
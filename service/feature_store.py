@@ -0,0 +1,136 @@
+"""On-disk store of featurized sessions, read through a memory map.
+
+A store is a directory with two files:
+
+* ``rows.f32``: the feature rows of every session, back to back, as a C-ordered
+  float32 array of shape (rows, features);
+* ``index.json``: the feature order, the number of rows and, per session key, the
+  offset and length of its rows.
+
+Sessions are sliced out of the memory map without copying. Appends write the new rows
+first and then replace the index, so an interrupted append leaves the store as it was.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from service.features import APTED_COLUMNS
+
+ROWS_FILE = "rows.f32"
+INDEX_FILE = "index.json"
+DTYPE = np.dtype("<f4")
+
+
+def read_feature_order(path: str = "model/selectedfeatures.csv") -> List[str]:
+    """Model feature order from the header of ``selectedfeatures.csv``, without APTED columns."""
+    with open(path, encoding="utf-8") as f:
+        header = f.readline().strip()
+    return [c.strip() for c in header.split(",") if c.strip() and c.strip() not in APTED_COLUMNS]
+
+
+class FeatureStore:
+    """Featurized sessions addressed by session key (see ``service.preprocess.get_session_key``)."""
+
+    def __init__(self, path: str, features: List[str], sessions: Dict[str, Tuple[int, int]], rows: int):
+        self.path = path
+        self.features = features
+        self._sessions = sessions
+        self._rows = rows
+        self._data: Optional[np.memmap] = None
+
+    @classmethod
+    def create(cls, path: str, features: List[str]) -> "FeatureStore":
+        """Create an empty store; fails if ``path`` already holds one."""
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, INDEX_FILE)):
+            raise FileExistsError(f"A feature store already exists in {path}")
+        open(os.path.join(path, ROWS_FILE), "wb").close()
+        store = cls(path, list(features), {}, 0)
+        store._write_index()
+        return store
+
+    @classmethod
+    def open(cls, path: str) -> "FeatureStore":
+        with open(os.path.join(path, INDEX_FILE), encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("dtype", DTYPE.str) != DTYPE.str:
+            raise ValueError(f"Unsupported feature store dtype {index['dtype']!r}")
+        sessions = {key: (int(offset), int(length)) for key, offset, length in index["sessions"]}
+        return cls(path, index["features"], sessions, int(index["rows"]))
+
+    @property
+    def data(self) -> np.ndarray:
+        """All rows as a read-only (rows, features) memory map."""
+        if self._data is None or self._data.shape[0] != self._rows:
+            if self._rows == 0:
+                return np.zeros((0, len(self.features)), dtype=DTYPE)
+            self._data = np.memmap(os.path.join(self.path, ROWS_FILE), dtype=DTYPE, mode="r",
+                                   shape=(self._rows, len(self.features)))
+        return self._data
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sessions
+
+    def keys(self) -> List[str]:
+        return list(self._sessions)
+
+    def lengths(self) -> Dict[str, int]:
+        return {key: length for key, (_, length) in self._sessions.items()}
+
+    def get(self, key: str) -> np.ndarray:
+        """Rows of one session as a (1, T, F) view of the memory map (no copy)."""
+        offset, length = self._sessions[key]
+        return self.data[offset:offset + length][np.newaxis]
+
+    def items(self) -> Iterator[Tuple[str, np.ndarray]]:
+        for key in self._sessions:
+            yield key, self.get(key)
+
+    def append(self, sessions: Iterable[Tuple[str, np.ndarray]]) -> Tuple[int, int]:
+        """Add (key, (T, F) rows) sessions whose key is not stored yet.
+
+        Returns the number of sessions added and skipped.
+        """
+        rows_path = os.path.join(self.path, ROWS_FILE)
+        added = skipped = 0
+        new_sessions = dict(self._sessions)
+        rows = self._rows
+        with open(rows_path, "r+b") as f:
+            # Drop rows left behind by an interrupted append
+            f.truncate(rows * len(self.features) * DTYPE.itemsize)
+            f.seek(0, os.SEEK_END)
+            for key, values in sessions:
+                if key in new_sessions or len(values) == 0:
+                    skipped += 1
+                    continue
+                values = np.ascontiguousarray(values, dtype=DTYPE)
+                if values.ndim != 2 or values.shape[1] != len(self.features):
+                    raise ValueError(f"Session {key}: expected (T, {len(self.features)}) rows, got {values.shape}")
+                f.write(values.tobytes())
+                new_sessions[key] = (rows, values.shape[0])
+                rows += values.shape[0]
+                added += 1
+            f.flush()
+            os.fsync(f.fileno())
+        self._sessions = new_sessions
+        self._rows = rows
+        self._write_index()
+        return added, skipped
+
+    def _write_index(self) -> None:
+        index = {
+            "dtype": DTYPE.str,
+            "features": self.features,
+            "rows": self._rows,
+            "sessions": [[key, offset, length] for key, (offset, length) in self._sessions.items()],
+        }
+        tmp = os.path.join(self.path, INDEX_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, os.path.join(self.path, INDEX_FILE))
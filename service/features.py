@@ -0,0 +1,203 @@
+"""Feature extraction shared by the web service and the offline tools."""
+
+import json
+from datetime import datetime
+from typing import List, Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Exact order of expected input features (15, aligned with training)
+FEATURE_ORDER = [
+    "student_sex",
+    "student_mother_tongue",
+    "student_age",
+    "student_competence",
+    "exercise_skill_parallelism",
+    "exercise_skill_logical_thinking",
+    "exercise_skill_flow_control",
+    "exercise_skill_user_interactivity",
+    "exercise_skill_information_representation",
+    "exercise_skill_abstraction",
+    "exercise_skill_synchronization",
+    "exercise_level",
+    "solution_distance_total_distance",
+    "seconds_help_open",
+    "total_seconds",
+]
+
+# Columns related to APTED not used by the model
+APTED_COLUMNS = ["apted_distance", "tree_grade"]
+
+# Mapping from skill display names to feature columns
+SKILL_NAME_MAP = {
+    "Paralelismo": "exercise_skill_parallelism",
+    "Pensamiento lógico": "exercise_skill_logical_thinking",
+    "Control de flujo": "exercise_skill_flow_control",
+    "Interactividad con el usuario": "exercise_skill_user_interactivity",
+    "Representación de la información": "exercise_skill_information_representation",
+    "Abstracción": "exercise_skill_abstraction",
+    "Sincronización": "exercise_skill_synchronization",
+}
+
+
+def parse_datetime(dt_str: str) -> Optional[datetime]:
+    """Try to parse a datetime string with or without microseconds."""
+    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(dt_str, fmt)
+        except Exception:
+            continue
+    # Fallback with pandas (more flexible)
+    try:
+        return pd.to_datetime(dt_str).to_pydatetime()
+    except Exception:
+        return None
+
+
+def transform_sequence(payload: List[Dict[str, Any]]) -> np.ndarray:
+    """Transform a list of interaction objects into model-ready tensor of shape (1, T, F)."""
+    if not isinstance(payload, list) or len(payload) == 0:
+        raise ValueError("Body must be a non-empty array of interactions")
+
+    rows = []
+    # Ensure chronological order by dateTime
+    sorted_payload = sorted(payload, key=lambda x: x.get("dateTime", ""))
+
+    # Compute total_seconds relative to the first action timestamp
+    first_dt = None
+    for item in sorted_payload:
+        dt = parse_datetime(item.get("dateTime")) if item.get("dateTime") else None
+        if dt is not None:
+            first_dt = dt
+            break
+
+    for item in sorted_payload:
+        row = {col: 0.0 for col in FEATURE_ORDER}
+
+        # Student fields: gender -> sex; motherTongue, age, competence
+        student = item.get("student", {}) or {}
+        if "gender" in student:
+            row["student_sex"] = float(student.get("gender") or 0)
+        if "motherTongue" in student:
+            row["student_mother_tongue"] = float(student.get("motherTongue") or 0)
+        if "age" in student:
+            row["student_age"] = float(student.get("age") or 0)
+        if "competence" in student:
+            row["student_competence"] = float(student.get("competence") or 0)
+        # motivation is not used as a final feature
+
+        # Exercise: map skills and level
+        exercise = item.get("exercise", {}) or {}
+        skills = exercise.get("skills", []) or []
+        for s in skills:
+            name = s.get("name")
+            score = float(s.get("score") or 0.0)
+            col = SKILL_NAME_MAP.get(name)
+            if col:
+                row[col] = score
+        if "level" in exercise:
+            row["exercise_level"] = float(exercise.get("level") or 0)
+
+        # ARTIE distances: totalDistance
+        solution_distance = item.get("solutionDistance", {}) or {}
+        if "totalDistance" in solution_distance:
+            row["solution_distance_total_distance"] = float(solution_distance.get("totalDistance") or 0.0)
+
+        # seconds_help_open
+        if "secondsHelpOpen" in item:
+            row["seconds_help_open"] = float(item.get("secondsHelpOpen") or 0.0)
+
+        # total_seconds relative to the first action
+        current_dt = parse_datetime(item.get("dateTime")) if item.get("dateTime") else None
+        if first_dt is not None and current_dt is not None:
+            row["total_seconds"] = max(0.0, (current_dt - first_dt).total_seconds())
+        else:
+            row["total_seconds"] = 0.0
+
+        # Drop APTED-related columns if present (not part of FEATURE_ORDER)
+        for c in APTED_COLUMNS:
+            if c in row:
+                row.pop(c, None)
+
+        # Keep the expected columns in fixed order
+        rows.append([row[c] for c in FEATURE_ORDER])
+
+    # Output shape (1, T, F)
+    X = np.array(rows, dtype=np.float32)
+    X = np.expand_dims(X, axis=0)
+    return X
+
+
+# Windowing modes: whole history, last K events, or events in the last K seconds
+WINDOW_MODES = ("none", "events", "seconds")
+
+
+def window_rows(rows: np.ndarray, time_index: int, mode: str, size: float,
+                summary: bool = False) -> Tuple[np.ndarray, int]:
+    """Keep only the most recent part of a chronologically sorted (T, F) feature matrix.
+
+    ``mode="events"`` keeps the last ``size`` rows; ``mode="seconds"`` keeps the rows whose
+    column ``time_index`` lies within ``size`` seconds of the last row. With ``summary``
+    the dropped rows are collapsed into a single leading row holding their column-wise
+    mean, except for the time column, which keeps the last dropped value so time stays
+    monotonic. Returns the windowed rows and the number of dropped rows.
+    """
+    if mode not in WINDOW_MODES:
+        raise ValueError(f"Unknown window mode: {mode}")
+    T = rows.shape[0]
+    if mode == "none" or T == 0:
+        return rows, 0
+    if mode == "events":
+        start = max(0, T - int(size))
+    else:
+        ts = rows[:, time_index]
+        # NaN timestamps compare False, so they never cause rows to be dropped
+        keep = ~(ts < ts[-1] - size)
+        start = int(np.argmax(keep))
+    # The last row is always kept, whatever the size
+    start = min(start, T - 1)
+    if start == 0:
+        return rows, 0
+
+    kept = rows[start:]
+    if summary:
+        context = rows[:start].mean(axis=0, keepdims=True)
+        context[0, time_index] = rows[start - 1, time_index]
+        kept = np.concatenate([context.astype(rows.dtype), kept])
+    return kept, start
+
+
+def window_sequence(X: np.ndarray, mode: str, size: float, summary: bool = False) -> Tuple[np.ndarray, int]:
+    """Apply ``window_rows`` to a (1, T, F) tensor built by ``transform_sequence``."""
+    rows, dropped = window_rows(X[0], FEATURE_ORDER.index("total_seconds"), mode, size, summary)
+    if dropped == 0:
+        return X, 0
+    return np.expand_dims(rows, axis=0), dropped
+
+
+def pad_batch(tensors: List[np.ndarray], pad_value: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack (1, T_i, F) tensors into a right-padded (N, T_max, F) batch and their lengths (N,)."""
+    lengths = np.array([X.shape[1] for X in tensors], dtype=np.int64)
+    T = int(lengths.max()) if len(tensors) else 0
+    F = tensors[0].shape[2] if len(tensors) else len(FEATURE_ORDER)
+    batch = np.full((len(tensors), T, F), pad_value, dtype=np.float32)
+    for i, X in enumerate(tensors):
+        batch[i, :X.shape[1]] = X[0]
+    return batch, lengths
+
+
+def read_sessions(path: str) -> List[List[Dict[str, Any]]]:
+    """Read a JSONL file holding one session (a JSON array of interactions) per line."""
+    sessions = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            session = json.loads(line)
+            if not isinstance(session, list):
+                raise ValueError(f"{path}:{line_no}: expected a JSON array of interactions")
+            sessions.append(session)
+    return sessions
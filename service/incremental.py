@@ -0,0 +1,233 @@
+"""Prefix-aware scoring for causal sequence models trained with ``return_sequences=True``.
+
+Appending events to a session does not change the model output for the earlier steps,
+so a session whose first N rows were already scored only needs the remaining rows to
+be computed, starting from the recurrent states saved at step N.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+_RECURRENT_LAYERS = (tf.keras.layers.LSTM, tf.keras.layers.GRU, tf.keras.layers.SimpleRNN)
+
+
+class SequenceScorer:
+    """Run a causal recurrent model layer by layer so scoring can resume from saved states.
+
+    Only linear stacks of Masking, unidirectional recurrent, Dropout and per-step Dense
+    (optionally wrapped in TimeDistributed) layers are supported; ``from_model`` returns
+    None for any other architecture.
+    """
+
+    def __init__(self, steps: List[Tuple[str, object]]):
+        self._steps = steps
+        # One trace for fresh sequences and one for resumed ones, whatever their length
+        self._forward = tf.function(self._forward_eager, reduce_retracing=True)
+
+    @staticmethod
+    def _clone_rnn(layer, **overrides):
+        cfg = layer.get_config()
+        cfg.update(overrides)
+        clone = layer.__class__.from_config(cfg)
+        kernel = layer.get_weights()[0]
+        clone(tf.zeros((1, 1, kernel.shape[0]), dtype=tf.float32))
+        clone.set_weights(layer.get_weights())
+        return clone
+
+    @classmethod
+    def from_model(cls, model) -> Optional["SequenceScorer"]:
+        if not isinstance(model, tf.keras.Model):
+            return None
+        steps = []
+        for layer in model.layers:
+            if isinstance(layer, tf.keras.layers.InputLayer):
+                continue
+            if isinstance(layer, tf.keras.layers.Dropout):
+                # Identity at inference time
+                continue
+            if isinstance(layer, tf.keras.layers.Masking):
+                steps.append(("mask", layer))
+            elif isinstance(layer, _RECURRENT_LAYERS):
+                cfg = layer.get_config()
+                if cfg.get("go_backwards") or cfg.get("stateful") or not cfg.get("return_sequences"):
+                    return None
+                # Same layer, but also returning its final states
+                steps.append(("rnn", cls._clone_rnn(layer, return_state=True)))
+            elif isinstance(layer, tf.keras.layers.Dense) or (
+                    isinstance(layer, tf.keras.layers.TimeDistributed)
+                    and isinstance(layer.layer, tf.keras.layers.Dense)):
+                steps.append(("dense", layer))
+            else:
+                return None
+        if not any(kind == "rnn" for kind, _ in steps):
+            return None
+        return cls(steps)
+
+    def score(self, X: np.ndarray, states: Optional[List[List[np.ndarray]]] = None):
+        """Score a (1, T, F) tensor, optionally continuing from ``states``.
+
+        Returns the per-step probabilities (T,) and the recurrent states after the last step.
+        """
+        x = tf.convert_to_tensor(X, dtype=tf.float32)
+        probs, new_states = self._forward(x, states)
+        return probs.numpy().reshape(-1), [[s.numpy() for s in layer_states] for layer_states in new_states]
+
+    def _forward_eager(self, x, states):
+        mask = None
+        new_states = []
+        rnn_index = 0
+        for kind, layer in self._steps:
+            if kind == "mask":
+                mask = tf.reduce_any(tf.not_equal(x, layer.mask_value), axis=-1)
+                x = x * tf.cast(mask, x.dtype)[..., tf.newaxis]
+            elif kind == "rnn":
+                initial_state = states[rnn_index] if states is not None else None
+                outputs = layer(x, mask=mask, initial_state=initial_state, training=False)
+                x = outputs[0]
+                new_states.append(list(outputs[1:]))
+                rnn_index += 1
+            else:
+                x = layer(x, training=False)
+        return x, new_states
+
+
+def prefix_hashes(X: np.ndarray) -> List[bytes]:
+    """Chained digest of every prefix of a (1, T, F) tensor: entry i covers rows [0, i]."""
+    rows = np.ascontiguousarray(X.reshape(X.shape[-2], X.shape[-1]))
+    digest = f"{rows.shape[1]}|{rows.dtype.str}".encode()
+    hashes = []
+    for row in rows:
+        digest = hashlib.blake2b(digest + row.tobytes(), digest_size=16).digest()
+        hashes.append(digest)
+    return hashes
+
+
+class _Entry:
+    __slots__ = ("hashes", "probs", "states")
+
+    def __init__(self, hashes, probs, states):
+        self.hashes = hashes
+        self.probs = probs
+        self.states = states
+
+
+class PrefixIndex:
+    """LRU index of recently scored sessions, searchable by their longest shared prefix.
+
+    Each entry keeps the per-step probabilities of a scored tensor and, when available,
+    the recurrent states after its last step. Every prefix of an entry is indexed, so a
+    lookup finds both cached sessions that extend the request and cached sessions that
+    the request extends.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # entry id -> _Entry
+        self._prefixes: Dict[bytes, Tuple[int, int]] = {}  # prefix hash -> (entry id, length)
+        self._next_id = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.full_hits = 0
+        self.resumed = 0
+        self.misses = 0
+        self.reused_steps = 0
+        self.computed_steps = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _reset(self, version) -> None:
+        self._entries.clear()
+        self._prefixes.clear()
+        self._version = version
+
+    def lookup(self, hashes: List[bytes], version) -> Tuple[int, Optional[_Entry]]:
+        """Return the longest cached prefix length of ``hashes`` and the entry holding it."""
+        with self._lock:
+            if version != self._version:
+                self._reset(version)
+            for n in range(len(hashes), 0, -1):
+                found = self._prefixes.get(hashes[n - 1])
+                if found is not None:
+                    entry_id, length = found
+                    self._entries.move_to_end(entry_id)
+                    return length, self._entries[entry_id]
+            return 0, None
+
+    def add(self, hashes: List[bytes], probs: np.ndarray, states, version) -> None:
+        with self._lock:
+            if version != self._version:
+                self._reset(version)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(hashes, probs, states)
+            for n, h in enumerate(hashes, start=1):
+                self._prefixes[h] = (entry_id, n)
+            while len(self._entries) > self.max_entries:
+                evicted_id, evicted = self._entries.popitem(last=False)
+                for h in evicted.hashes:
+                    if self._prefixes.get(h, (None,))[0] == evicted_id:
+                        del self._prefixes[h]
+
+    def record(self, outcome: str, reused: int, computed: int) -> None:
+        """Count a lookup outcome ("full_hits", "resumed" or "misses") and the steps it saved."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.reused_steps += reused
+            self.computed_steps += computed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "full_hits": self.full_hits,
+                "resumed": self.resumed,
+                "misses": self.misses,
+                "reused_steps": self.reused_steps,
+                "computed_steps": self.computed_steps,
+            }
+
+
+def score_with_prefix_cache(model, scorer: Optional[SequenceScorer], index: PrefixIndex,
+                            X: np.ndarray, version, last_only: bool = False) -> np.ndarray:
+    """Per-step probabilities (T,) for a (1, T, F) tensor, reusing the longest cached prefix.
+
+    * The request is a prefix of a cached session: its probabilities are sliced out.
+    * A cached session is a prefix of the request and its final states are known:
+      only the new suffix is computed, starting from those states.
+    * Otherwise the whole sequence is scored.
+
+    With ``last_only`` only the last probability is returned (shape (1,)). The sequence is
+    still scored and indexed as usual, so a poller reading the last step of a growing
+    session only computes its new steps.
+    """
+    hashes = prefix_hashes(X)
+    T = len(hashes)
+    n, entry = index.lookup(hashes, version)
+
+    if entry is not None and n == T:
+        index.record("full_hits", T, 0)
+        return entry.probs[T - 1:T] if last_only else entry.probs[:T]
+
+    # States are only stored for an entry's last step, so resuming needs n == entry length
+    if entry is not None and scorer is not None and entry.states is not None and n == len(entry.hashes):
+        suffix, states = scorer.score(X[:, n:, :], entry.states)
+        probs = np.concatenate([entry.probs[:n], suffix.astype(np.float32)])
+        index.record("resumed", n, T - n)
+    else:
+        if scorer is not None:
+            probs, states = scorer.score(X)
+        else:
+            probs, states = model.predict(X, verbose=0).reshape(-1), None
+        probs = probs.astype(np.float32)
+        index.record("misses", 0, T)
+
+    index.add(hashes, probs, states, version)
+    return probs[T - 1:T] if last_only else probs
@@ -0,0 +1,240 @@
+"""Prometheus-style metrics for the web service, rendered in the text exposition format.
+
+Metric children are bound once per label combination, so recording a value on the
+request path is a lock plus an integer/float update, with no allocations.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond parsing to multi-second inference
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Sequence length buckets in time steps
+LENGTH_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Batch size buckets in sessions
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _NoopChild:
+    """Stand-in for every metric child when metrics are disabled."""
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+_NOOP = _NoopChild()
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Return the child for a label combination; bind it once and keep the reference."""
+        values = tuple(str(v) for v in values)
+        with self._lock:
+            child = self._children.get(values)
+            if child is None:
+                child = self._children[values] = self._new_child()
+            return child
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in sorted(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in sorted(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total, count = child.sum, child.count
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, values)} {repr(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, values)} {count}"
+
+
+class Registry:
+    """Collection of metrics plus callbacks that read values owned by other components."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._callbacks: List[Tuple[str, str, str, Callable[[], Dict[Tuple[str, ...], float]], Tuple[str, ...]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_callback(self, name: str, documentation: str, kind: str, labelnames: Sequence[str],
+                          fn: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+        """Expose values computed at scrape time by ``fn`` as {label values: value}."""
+        self._callbacks.append((name, documentation, kind, fn, tuple(labelnames)))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, documentation, kind, fn, labelnames in self._callbacks:
+            try:
+                values = fn()
+            except Exception as e:
+                print(f"[WARN] Metrics callback {name} failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for label_values, value in sorted(values.items()):
+                lines.append(f"{name}{_format_labels(labelnames, label_values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class ServiceMetrics:
+    """Metrics of the help model web service.
+
+    With ``enabled=False`` every pre-bound child is a no-op, so instrumented code
+    needs no conditionals and pays only for an attribute lookup and a call.
+    """
+
+    STAGES = ("parse", "transform", "cache", "predict", "attention", "serialize")
+    ERRORS = ("invalid_input", "model_unavailable", "prediction_error", "saturated")
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.registry = Registry()
+        r = self.registry
+
+        self.requests = r.register(Counter("help_requests_total", "Requests by endpoint and status code.",
+                                           ("endpoint", "status")))
+        self.errors = r.register(Counter("help_request_errors_total", "Failed requests by error class.",
+                                         ("error",)))
+        self.latency = r.register(Histogram("help_request_duration_seconds", "End-to-end request latency.",
+                                            ("endpoint",)))
+        self.stages = r.register(Histogram("help_stage_duration_seconds", "Latency of each predict pipeline stage.",
+                                           ("stage",)))
+        self.sequence_length = r.register(Histogram("help_sequence_length", "Time steps scored per session.",
+                                                    buckets=LENGTH_BUCKETS))
+        self.batch_size = r.register(Histogram("help_batch_size", "Sessions per model call.",
+                                               buckets=BATCH_BUCKETS))
+        self.model_load = r.register(Gauge("help_model_load_seconds", "Duration of the last model load.",
+                                           ("model",)))
+
+        # Children bound once; the request path only touches these attributes
+        self.stage = {stage: self._bind(self.stages, stage) for stage in self.STAGES}
+        self.error = {error: self._bind(self.errors, error) for error in self.ERRORS}
+        self.predict_latency = self._bind(self.latency, "predict")
+        self.attention_latency = self._bind(self.latency, "attention")
+        self.sequence_length_child = self._bind(self.sequence_length)
+        self.batch_size_child = self._bind(self.batch_size)
+        self._status = {}
+
+    def _bind(self, metric: _Metric, *labels: str):
+        return metric.labels(*labels) if self.enabled else _NOOP
+
+    def request(self, endpoint: str, status: int):
+        """Child counting requests of an endpoint with a given status (bound on first use)."""
+        key = (endpoint, status)
+        child = self._status.get(key)
+        if child is None:
+            child = self._status[key] = self._bind(self.requests, endpoint, str(status))
+        return child
+
+    def render(self) -> str:
+        return self.registry.render()
@@ -0,0 +1,111 @@
+"""Multi-process batch scoring of many sessions.
+
+Sessions are sorted by length and cut into batches, so each batch pads little (only
+causal models are scored on padded batches, see ``service.batching.predict_steps``);
+the batches are spread over a pool of processes, longest first, and the results are put
+back in input order. Every worker loads the model once and gets its own share of the
+cores for TensorFlow, so the workers do not oversubscribe the machine.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+# Per-process state of the pool workers, set by _init_worker
+_worker = {}
+
+
+def default_threads(workers: int) -> int:
+    """TensorFlow intra-op threads per worker so that all workers together use every core once."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def plan_batches(lengths: Sequence[int], batch_size: int) -> List[np.ndarray]:
+    """Indices of sessions grouped into batches of similar length, longest batches first."""
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    # Longest work first keeps the last workers from finishing alone
+    return batches[::-1]
+
+
+def _init_worker(model_path: str, intra_op_threads: int, inter_op_threads: int, store_path: Optional[str]) -> None:
+    from service.executor import configure_tf_threads
+    configure_tf_threads(intra_op_threads, inter_op_threads)
+    import tensorflow as tf
+    from service.feature_store import FeatureStore
+    from service.incremental import SequenceScorer
+    model = tf.keras.models.load_model(model_path, compile=False, safe_mode=False)
+    _worker["model"] = model
+    # Right-padding leaves the outputs of real steps unchanged only for causal models
+    _worker["pad"] = SequenceScorer.from_model(model) is not None
+    _worker["store"] = FeatureStore.open(store_path) if store_path else None
+
+
+def _score_batch(items: list, batch_size: int, include_sequence: bool, from_store: bool = True):
+    """Score (1, T, F) tensors or, if the worker has a store and ``from_store``, store keys."""
+    from service.batching import predict_steps
+    store = _worker["store"] if from_store else None
+    tensors = [store.get(item) if store is not None else item for item in items]
+    probs, lengths = predict_steps(_worker["model"], tensors, batch_size, pad=_worker["pad"])
+    if include_sequence:
+        return [probs[i, :n].copy() for i, n in enumerate(lengths)]
+    return probs[np.arange(len(tensors)), np.maximum(lengths - 1, 0)]
+
+
+class ParallelScorer:
+    """Score sessions with a pool of ``workers`` processes, each holding the model.
+
+    Sessions are given as (1, T, F) tensors or, with ``store_path``, as keys of a
+    ``FeatureStore`` that every worker opens (only the keys cross process boundaries).
+    """
+
+    def __init__(self, model_path: str, workers: int, batch_size: int = 64, intra_op_threads: int = 0,
+                 inter_op_threads: int = 1, store_path: Optional[str] = None):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.intra_op_threads = intra_op_threads or default_threads(self.workers)
+        self.inter_op_threads = inter_op_threads
+        self.store = None
+        if store_path:
+            from service.feature_store import FeatureStore
+            self.store = FeatureStore.open(store_path)
+        # spawn: workers must not inherit a TensorFlow runtime initialised by the parent
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+            initargs=(model_path, self.intra_op_threads, self.inter_op_threads, store_path))
+
+    def warm_up(self) -> None:
+        """Start every worker and load its model before timing anything."""
+        from service.features import FEATURE_ORDER
+        n_features = len(self.store.features) if self.store is not None else len(FEATURE_ORDER)
+        X = np.zeros((1, 2, n_features), dtype=np.float32)
+        n = self.workers
+        list(self._pool.map(_score_batch, [[X]] * n, [1] * n, [False] * n, [False] * n))
+
+    def score(self, items: Sequence[Union[np.ndarray, str]], include_sequence: bool = False) -> list:
+        """Last-step probability (float) of every session, or its per-step probabilities (T,), in input order."""
+        if self.store is not None:
+            known = self.store.lengths()
+            lengths = [known[key] for key in items]
+        else:
+            lengths = [X.shape[1] for X in items]
+        batches = plan_batches(lengths, self.batch_size)
+        futures = [self._pool.submit(_score_batch, [items[i] for i in batch], self.batch_size, include_sequence)
+                   for batch in batches]
+        results = [None] * len(items)
+        for batch, future in zip(batches, futures):
+            for i, value in zip(batch, future.result()):
+                results[i] = value if include_sequence else float(value)
+        return results
+
+    def close(self) -> None:
+        self._pool.shutdown()
+
+    def __enter__(self) -> "ParallelScorer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
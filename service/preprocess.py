@@ -2,6 +2,8 @@ import logging
 from datetime import datetime
 import pandas as pd
 
+from service.features import window_rows
+
 
 # Function to load the json data
 def sort(json_data):
@@ -176,8 +178,40 @@ def write_pedagogical_software_interventions_df(interventions, first_actions):
     return pd.DataFrame(df_list)
 
 
-# Function to transform the received data
-def data_transformation(json_data):
+# Function to get the session key (student, exercise and last login) of an intervention
+def get_session_key(element):
+    student_id = None
+    exercise_id = None
+    if 'student' in element:
+        student_id = element['student'].get('_id', element['student'].get('id'))
+    if 'exercise' in element:
+        exercise_id = element['exercise'].get('_id', element['exercise'].get('id'))
+    last_login = element.get('lastLogin')
+    return str(student_id) + '_' + str(exercise_id) + '_' + str(last_login)
+
+
+# Function to keep only the most recent events of each session (see service.features.window_rows)
+def window_sessions(df, session_keys, window_mode, window_size, window_summary=False):
+    time_index = list(df.columns).index('total_seconds')
+
+    # Row positions of each session, in order of first appearance
+    sessions = {}
+    for position, key in enumerate(session_keys):
+        sessions.setdefault(key, []).append(position)
+
+    frames = []
+    for positions in sessions.values():
+        rows = df.iloc[positions].to_numpy(dtype=float)
+        rows, _ = window_rows(rows, time_index, window_mode, window_size, window_summary)
+        frames.append(pd.DataFrame(rows, columns=df.columns))
+
+    if len(frames) == 0:
+        return df
+    return pd.concat(frames, ignore_index=True)
+
+
+# Function to transform the received data, also returning the session key of every row
+def session_transformation(json_data):
     # 1- Sorts the information
     data = sort(json_data)
 
@@ -187,4 +221,21 @@ def data_transformation(json_data):
     # 3- Creating the dataframe
     df = write_pedagogical_software_interventions_df(data, actions)
 
+    return df, [get_session_key(element) for element in data]
+
+
+# Function to transform the received data
+def data_transformation(json_data, window_mode='none', window_size=None, window_summary=False):
+    # Same window size rules as the web service (HELP_WINDOW_SIZE)
+    if window_mode == 'events' and (window_size is None or window_size < 1):
+        raise ValueError(f"window_size must be >= 1 with window_mode='events', got {window_size}")
+    if window_mode == 'seconds' and (window_size is None or not window_size > 0):
+        raise ValueError(f"window_size must be > 0 with window_mode='seconds', got {window_size}")
+
+    df, session_keys = session_transformation(json_data)
+
+    # 4- Bounds the history of each session, as the web service does
+    if window_mode != 'none':
+        df = window_sessions(df, session_keys, window_mode, window_size, window_summary)
+
     return df
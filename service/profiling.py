@@ -0,0 +1,210 @@
+"""On-demand profiling of individual requests.
+
+A selected request runs under a sampling profiler attached to its worker thread (Python
+stacks) and, optionally, a TensorFlow profiler trace (op timings, summarized per op type
+and viewable in TensorBoard). The last profiles are kept in a bounded ring buffer.
+"""
+
+import glob
+import hmac
+import itertools
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import tensorflow as tf
+
+
+class SamplingProfiler:
+    """Periodically sample the Python stack of one thread and count identical stacks."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            # Collapsed format, outermost frame first (flame graph tools read it directly)
+            key = ";".join(reversed(stack))
+            self._stacks[key] = self._stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, top: int = 50) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        stacks = sorted(self._stacks.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "stacks": [{"stack": stack, "count": count} for stack, count in stacks[:top]],
+        }
+
+
+def summarize_tf_trace(trace_dir: str, top: int = 20) -> Dict[str, Any]:
+    """Time spent per TensorFlow op type and per op in a profiler trace, largest first.
+
+    Reads the ``*.xplane.pb`` files of ``trace_dir`` and sums the durations of the op
+    events of the host compute threads (named ``<op name>:<op type>``, with the op type
+    as display name; executor bookkeeping events have no display name).
+    """
+    from tensorflow.tsl.profiler.protobuf import xplane_pb2
+
+    by_type: Dict[str, List[float]] = {}
+    by_op: Dict[str, List[float]] = {}
+    for path in glob.glob(os.path.join(trace_dir, "**", "*.xplane.pb"), recursive=True):
+        space = xplane_pb2.XSpace()
+        with open(path, "rb") as f:
+            space.ParseFromString(f.read())
+        for plane in space.planes:
+            for line in plane.lines:
+                if not line.name.startswith("tf_Compute"):
+                    continue
+                for event in line.events:
+                    metadata = plane.event_metadata[event.metadata_id]
+                    op_type = metadata.display_name
+                    if not op_type:
+                        continue
+                    op_name = metadata.name.rpartition(":")[0] or metadata.name
+                    ms = event.duration_ps / 1e9
+                    for key, totals in ((op_type, by_type), (op_name, by_op)):
+                        entry = totals.setdefault(key, [0, 0.0])
+                        entry[0] += 1
+                        entry[1] += ms
+
+    def ranked(totals: Dict[str, List[float]], field: str) -> List[Dict[str, Any]]:
+        items = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        return [{field: key, "count": count, "total_ms": round(ms, 4)} for key, (count, ms) in items]
+
+    return {
+        "total_ms": round(sum(ms for _, ms in by_type.values()), 4),
+        "op_types": ranked(by_type, "op_type"),
+        "ops": ranked(by_op, "op"),
+    }
+
+
+class RequestProfiler:
+    """Decide which requests to profile, run them under the profilers and keep the results.
+
+    A request is profiled when it carries the admin token in its profiling header or,
+    independently, with probability ``sample_rate``. With no token and a zero rate,
+    ``should_profile`` returns immediately and requests run unchanged.
+    """
+
+    def __init__(self, admin_token: str = "", sample_rate: float = 0.0, buffer_size: int = 20,
+                 interval: float = 0.005, tf_dir: str = ""):
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.tf_dir = tf_dir
+        self._profiles = deque(maxlen=max(1, buffer_size))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # The TensorFlow profiler is process-wide: only one trace can run at a time
+        self._tf_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.admin_token) or self.sample_rate > 0
+
+    def should_profile(self, header_value: Optional[str]) -> Optional[str]:
+        """Return why a request should be profiled ("header" or "sampled"), or None."""
+        # Constant-time comparison: this header is accepted on the unauthenticated predict endpoint
+        if (header_value and self.admin_token
+                and hmac.compare_digest(header_value.encode(), self.admin_token.encode())):
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def run(self, reason: str, fn: Callable[..., Any], *args) -> Any:
+        """Call ``fn(*args)`` on the current thread while profiling it."""
+        profile_id = next(self._ids)
+        sampler = SamplingProfiler(threading.get_ident(), self.interval)
+        tf_trace = None
+        if self.tf_dir and self._tf_lock.acquire(blocking=False):
+            tf_trace = os.path.join(self.tf_dir, f"profile-{os.getpid()}-{profile_id}")
+            try:
+                tf.profiler.experimental.start(tf_trace)
+            except Exception as e:
+                print(f"[WARN] Could not start TensorFlow profiler: {e}")
+                self._tf_lock.release()
+                tf_trace = None
+
+        outcome = "ok"
+        started_at = time.time()
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            return fn(*args)
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            python = sampler.stop()
+            if tf_trace is not None:
+                try:
+                    tf.profiler.experimental.stop()
+                except Exception as e:
+                    print(f"[WARN] Could not stop TensorFlow profiler: {e}")
+                    tf_trace = None
+                finally:
+                    self._tf_lock.release()
+            self._store({
+                "id": profile_id,
+                "reason": reason,
+                "started_at": started_at,
+                "duration": duration,
+                "outcome": outcome,
+                "python": python,
+                "tf_trace": tf_trace,
+            })
+
+    def _store(self, profile: Dict[str, Any]) -> None:
+        with self._lock:
+            if len(self._profiles) == self._profiles.maxlen:
+                evicted = self._profiles[0]
+                if evicted["tf_trace"]:
+                    shutil.rmtree(evicted["tf_trace"], ignore_errors=True)
+            self._profiles.append(profile)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{k: v for k, v in p.items() if k != "python"} | {"samples": p["python"]["samples"]}
+                    for p in reversed(self._profiles)]
+
+    def get(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        """One profile, with the op timings of its TensorFlow trace under ``tf_ops``."""
+        with self._lock:
+            profile = next((p for p in self._profiles if p["id"] == profile_id), None)
+        if profile is None:
+            return None
+        profile = dict(profile)
+        profile["tf_ops"] = None
+        if profile["tf_trace"]:
+            try:
+                profile["tf_ops"] = summarize_tf_trace(profile["tf_trace"])
+            except Exception as e:
+                # The trace may have been evicted meanwhile, or the protobuf module be missing
+                print(f"[WARN] Could not summarize TensorFlow trace {profile['tf_trace']}: {e}")
+        return profile
@@ -0,0 +1,111 @@
+"""Post-training quantization of the help models and the TFLite runtime used to serve them."""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+
+# Supported model variants; "keras" is the original float32 model
+VARIANTS = ("keras", "float16", "int8")
+
+
+class TFLiteModel:
+    """Serve a converted ``.tflite`` model behind the same ``predict`` call used for Keras models."""
+
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        self.path = path
+        self._interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._shape = None
+        # The interpreter keeps its tensors in place, so calls must not overlap
+        self._lock = threading.Lock()
+
+    def predict(self, X: np.ndarray, verbose: int = 0) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        with self._lock:
+            if self._shape != X.shape:
+                # Sequences have variable length: resize the input before every new shape
+                self._interpreter.resize_tensor_input(self._input["index"], X.shape, strict=False)
+                self._interpreter.allocate_tensors()
+                self._shape = X.shape
+            self._interpreter.set_tensor(self._input["index"], X)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output["index"]).copy()
+
+    @property
+    def max_batch_size(self) -> Optional[int]:
+        """Sessions per call the artifact accepts, or None if its batch dimension is dynamic."""
+        batch = int(self._input["shape_signature"][0])
+        return batch if batch > 0 else None
+
+
+def quantize_model(model, variant: str, calibration: Optional[List[np.ndarray]] = None) -> bytes:
+    """Convert a Keras model into a quantized TFLite flatbuffer.
+
+    ``float16`` stores the weights in half precision; ``int8`` quantizes weights and
+    activations using ``calibration`` tensors of shape (1, T, F) as representative data.
+    """
+    if variant not in VARIANTS or variant == "keras":
+        raise ValueError(f"Unsupported quantization variant: {variant}")
+    if variant == "int8" and not calibration:
+        raise ValueError("int8 quantization needs a non-empty calibration set")
+
+    # Keep the time axis dynamic so one artifact serves every sequence length
+    n_features = int(model.inputs[0].shape[-1])
+    spec = tf.TensorSpec([1, None, n_features], tf.float32)
+    fn = tf.function(lambda x: model(x, training=False)).get_concrete_function(spec)
+    # Freeze the weights: resource variables do not survive input resizing in the interpreter
+    frozen = convert_variables_to_constants_v2(fn, lower_control_flow=False)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([frozen])
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    # Recurrent layers with masking need TF ops that have no builtin TFLite kernel
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    converter._experimental_lower_tensor_list_ops = False
+
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        def representative_dataset():
+            for X in calibration:
+                yield [np.asarray(X, dtype=np.float32)]
+
+        converter.representative_dataset = representative_dataset
+
+    return converter.convert()
+
+
+def compare_models(reference, candidate, tensors: Iterable[np.ndarray], threshold: float) -> Dict[str, Any]:
+    """Compare per-step probabilities of two models over a set of (1, T, F) tensors.
+
+    Reports the maximum and mean absolute deviation of ``sequence_probabilities`` and
+    the fraction of sessions whose ``help_needed`` decision flips at ``threshold``.
+    """
+    sessions = 0
+    steps = 0
+    flips = 0
+    max_dev = 0.0
+    sum_dev = 0.0
+    for X in tensors:
+        ref = np.asarray(reference.predict(X, verbose=0), dtype=np.float64).reshape(-1)
+        cand = np.asarray(candidate.predict(X, verbose=0), dtype=np.float64).reshape(-1)
+        if ref.size == 0:
+            continue
+        dev = np.abs(ref - cand)
+        max_dev = max(max_dev, float(dev.max()))
+        sum_dev += float(dev.sum())
+        steps += int(dev.size)
+        flips += int((ref[-1] >= threshold) != (cand[-1] >= threshold))
+        sessions += 1
+
+    return {
+        "sessions": sessions,
+        "steps": steps,
+        "max_deviation": max_dev,
+        "mean_deviation": sum_dev / steps if steps else 0.0,
+        "flip_rate": flips / sessions if sessions else 0.0,
+        "threshold": threshold,
+    }
@@ -0,0 +1,302 @@
+"""Versioned model registry with background loading, atomic swaps and rollback.
+
+A version is loaded and warmed up off the request path, then published by replacing
+a single reference. Requests read that reference once and keep using the bundle they
+got, so a swap never interrupts in-flight predictions. The previously active bundle
+is kept loaded so a rollback is instant.
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+def _version_key(version: str):
+    """Natural sort key: ``v10`` sorts after ``v9``."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", version)]
+
+
+def discover_versions(models_dir: str, filename: str) -> List[str]:
+    """Subdirectories of ``models_dir`` holding ``filename``, oldest to newest by name."""
+    try:
+        names = os.listdir(models_dir)
+    except FileNotFoundError:
+        return []
+    versions = [name for name in names if os.path.isfile(os.path.join(models_dir, name, filename))]
+    return sorted(versions, key=_version_key)
+
+
+def backoff_delay(backoff: float, backoff_max: float, failures: int) -> float:
+    """Delay before the next attempt after ``failures`` consecutive failures (doubling, capped)."""
+    return min(backoff_max, backoff * 2 ** (failures - 1))
+
+
+class RetryLoader:
+    """Single-flight background retries of a load function, with exponential backoff.
+
+    ``request()`` starts ``fn`` on a background thread unless an attempt is running or
+    the backoff after the last failure has not elapsed, so callers never wait and never
+    load concurrently. ``fn`` returns True on success; False or an exception is a failure.
+    """
+
+    def __init__(self, fn: Callable[[], bool], backoff: float = 1.0, backoff_max: float = 60.0,
+                 name: str = "loader"):
+        self._fn = fn
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.name = name
+        self.failures = 0
+        self._next_attempt = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loading(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def retry_after(self) -> float:
+        return max(0.0, self._next_attempt - time.monotonic())
+
+    def record_failure(self) -> None:
+        """Count a failed attempt made elsewhere and push the next one back."""
+        with self._lock:
+            self.failures += 1
+            self._next_attempt = time.monotonic() + backoff_delay(self.backoff, self.backoff_max, self.failures)
+
+    def request(self) -> None:
+        with self._lock:
+            if self.loading or time.monotonic() < self._next_attempt:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            ok = self._fn()
+        except Exception as e:
+            print(f"[WARN] {self.name} attempt failed: {e}")
+            ok = False
+        if ok:
+            with self._lock:
+                self.failures = 0
+                self._next_attempt = 0.0
+        else:
+            self.record_failure()
+
+
+class ModelBundle:
+    """Models and derived objects of one version, served together."""
+
+    __slots__ = ("version", "model", "variant", "scorer", "attention_model", "attention_variant",
+                 "attention_version", "attention_path", "quantized_attention_path", "attention_loader",
+                 "loaded_at")
+
+    def __init__(self, version: str, model, variant: str, scorer=None, attention_model=None,
+                 attention_variant: Optional[str] = None, attention_version: Optional[str] = None,
+                 attention_path: str = "", quantized_attention_path: str = ""):
+        self.version = version
+        self.model = model
+        self.variant = variant
+        self.scorer = scorer
+        self.attention_model = attention_model
+        self.attention_variant = attention_variant
+        self.attention_version = attention_version
+        self.attention_path = attention_path
+        self.quantized_attention_path = quantized_attention_path
+        # Set when the attention model exists but failed to load: retries it in the background
+        self.attention_loader: Optional[RetryLoader] = None
+        self.loaded_at = time.time()
+
+    def describe(self) -> Dict[str, Any]:
+        return {"version": self.version, "variant": self.variant,
+                "attention_model": "loaded" if self.attention_model is not None else "absent",
+                "attention_variant": self.attention_variant, "loaded_at": self.loaded_at}
+
+
+class ModelRegistry:
+    """Keep the newest available model version active.
+
+    ``discover()`` lists the available versions, oldest to newest; ``load(version)``
+    returns a ``ModelBundle`` and ``warm_up(bundle)`` runs it once before it is
+    published. A version that fails to load is retried by later refreshes with exponential
+    backoff, so a version caught half-copied is picked up once complete, and at once by
+    ``refresh(retry_failed=True)``; a version that was rolled back is not activated again
+    automatically.
+
+    While no version is active, ``request_load()`` retries in the background, one
+    attempt at a time and with exponential backoff between failed attempts.
+    """
+
+    def __init__(self, discover: Callable[[], List[str]], load: Callable[[str], ModelBundle],
+                 warm_up: Optional[Callable[[ModelBundle], None]] = None, poll_interval: float = 0.0,
+                 retry_backoff: float = 1.0, retry_backoff_max: float = 60.0):
+        self._discover = discover
+        self._load = load
+        self._warm_up = warm_up
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self._current: Optional[ModelBundle] = None
+        self._previous: Optional[ModelBundle] = None
+        self._failed: Dict[str, Dict[str, Any]] = {}  # version -> error, failures, retry_at
+        self._rejected = set()
+        self._swap_lock = threading.Lock()
+        # Only one version is loaded at a time, whoever asks for it
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+        self.swaps = 0
+        self._retry = RetryLoader(self._retry_load, retry_backoff, retry_backoff_max, "model-loader")
+
+    @property
+    def current(self) -> Optional[ModelBundle]:
+        """Active bundle; read it once per request and keep the reference."""
+        return self._current
+
+    @property
+    def previous(self) -> Optional[ModelBundle]:
+        return self._previous
+
+    @property
+    def loading(self) -> bool:
+        return self._retry.loading
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the next background load attempt may start."""
+        return self._retry.retry_after
+
+    def request_load(self) -> None:
+        """Start a background load unless one is running or backing off; never blocks."""
+        self._retry.request()
+
+    def _retry_load(self) -> bool:
+        return self.refresh(retry_failed=True) is not None
+
+    def _candidate(self, skip=()) -> Optional[str]:
+        now = time.monotonic()
+        for version in reversed(self._discover()):
+            failed = self._failed.get(version)
+            if version in skip or version in self._rejected:
+                continue
+            if failed is None or now >= failed["retry_at"]:
+                return version
+        return None
+
+    def _record_failure(self, version: str, error: str) -> None:
+        failures = self._failed.get(version, {}).get("failures", 0) + 1
+        delay = backoff_delay(self.retry_backoff, self.retry_backoff_max, failures)
+        self._failed[version] = {"error": error, "failures": failures, "retry_at": time.monotonic() + delay}
+
+    def refresh(self, retry_failed: bool = False) -> Optional[ModelBundle]:
+        """Load, warm up and activate the newest version if it is not active yet.
+
+        When it fails to load, older versions still newer than the active one are tried
+        in turn. Returns the active bundle.
+        """
+        with self._load_lock:
+            if retry_failed:
+                self._failed.clear()
+            tried = set()
+            while True:
+                try:
+                    version = self._candidate(skip=tried)
+                except Exception as e:
+                    self.last_error = f"Could not list model versions: {e}"
+                    print(f"[WARN] {self.last_error}")
+                    return self._current
+                current = self._current
+                if version is None or (current is not None and current.version == version):
+                    if version is None and current is None and self.last_error is None:
+                        self.last_error = "No model version available"
+                    return self._current
+                if self._previous is not None and self._previous.version == version:
+                    # Already loaded and warm
+                    self._activate(self._previous)
+                    return self._current
+                tried.add(version)
+                try:
+                    bundle = self._load(version)
+                    if self._warm_up is not None:
+                        self._warm_up(bundle)
+                except Exception as e:
+                    self._record_failure(version, str(e))
+                    self.last_error = f"Failed to load model version {version}: {e}"
+                    print(f"[ERROR] {self.last_error}")
+                    continue
+                self._failed.pop(version, None)
+                self._activate(bundle)
+                self.last_error = None
+                print(f"[INFO] Activated model version {version}")
+                return self._current
+
+    def _activate(self, bundle: ModelBundle) -> None:
+        with self._swap_lock:
+            if self._current is not None and self._current is not bundle:
+                self._previous = self._current
+            self._current = bundle
+            self.swaps += 1
+
+    def rollback(self) -> ModelBundle:
+        """Reactivate the previous bundle; the version rolled back from is not reloaded automatically.
+
+        Raises ``LookupError`` when there is no previous bundle.
+        """
+        with self._load_lock, self._swap_lock:
+            if self._previous is None:
+                raise LookupError("No previous model version to roll back to")
+            if self._current is not None:
+                self._rejected.add(self._current.version)
+            self._rejected.discard(self._previous.version)
+            self._current, self._previous = self._previous, self._current
+            self.swaps += 1
+        print(f"[INFO] Rolled back to model version {self._current.version}")
+        return self._current
+
+    def status(self) -> Dict[str, Any]:
+        try:
+            available = self._discover()
+        except Exception:
+            available = []
+        return {
+            "active": self._current.describe() if self._current is not None else None,
+            "previous": self._previous.describe() if self._previous is not None else None,
+            "available": available,
+            "failed": {version: {"error": f["error"], "failures": f["failures"],
+                                 "retry_after": max(0.0, f["retry_at"] - time.monotonic())}
+                       for version, f in list(self._failed.items())},
+            "rolled_back": sorted(self._rejected, key=_version_key),
+            "poll_interval": self.poll_interval,
+            "swaps": self.swaps,
+            "loading": self._retry.loading,
+            "consecutive_failures": self._retry.failures,
+            "retry_after": self._retry.retry_after,
+            "last_error": self.last_error,
+        }
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self._current is None:
+                    self.request_load()
+                else:
+                    self.refresh()
+            except Exception as e:
+                print(f"[WARN] Model registry poll failed: {e}")
+
+    def start(self) -> None:
+        """Watch for new versions every ``poll_interval`` seconds (no-op if it is 0)."""
+        if self.poll_interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._poll, name="model-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,55 @@
+"""Response serialization straight from NumPy arrays."""
+
+import base64
+import json
+from typing import Any, Optional
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: the standard library encoder is used instead
+    orjson = None
+
+# Encodings of sequence_probabilities: a JSON array, or little-endian float32 bytes in base64
+ENCODINGS = ("json", "base64")
+BASE64_ENCODING_NAME = "base64-float32-le"
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize a response body that may contain NumPy arrays and scalars."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_probabilities(probs: np.ndarray, digits: Optional[int], encoding: str):
+    """Prepare per-step probabilities for the response without converting them to Python floats.
+
+    JSON values are written from float64, like ``last_probability`` (``float(probs[-1])``),
+    so both fields print the same digits with orjson and with the standard library encoder.
+    """
+    if encoding == "base64":
+        return base64.b64encode(np.ascontiguousarray(probs, dtype="<f4").tobytes()).decode("ascii")
+    probs = np.ascontiguousarray(probs, dtype=np.float64)
+    if digits is not None:
+        return np.round(probs, digits)
+    return probs
+
+
+class NumpyJSONResponse(JSONResponse):
+    """JSON response whose content may hold NumPy arrays; bytes are sent as already rendered."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
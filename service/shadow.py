@@ -0,0 +1,136 @@
+"""Shadow evaluation of a candidate model on a sample of live traffic.
+
+Sampled inputs are put on a bounded queue (never waiting) and scored by the candidate
+on a background thread, after the primary response has been computed. Agreement on
+``help_needed``, probability deltas and latencies are aggregated for comparison.
+"""
+
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+# Recent observations kept to compute percentiles
+_WINDOW = 1000
+
+
+def _summary(values) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"mean": None, "p50": None, "p95": None, "max": None}
+    arr = np.asarray(values, dtype=np.float64)
+    return {"mean": float(arr.mean()), "p50": float(np.percentile(arr, 50)),
+            "p95": float(np.percentile(arr, 95)), "max": float(arr.max())}
+
+
+class ShadowEvaluator:
+    """Mirror sampled inputs to a candidate model and compare it with the primary.
+
+    ``load()`` returns ``(predict, version)`` where ``predict(X)`` gives the per-step
+    probabilities (T,) of a (1, T, F) tensor; it is called on the worker thread the first
+    time a sample arrives. With ``sample_rate <= 0`` the evaluator is disabled.
+    """
+
+    def __init__(self, load: Callable[[], Tuple[Callable[[np.ndarray], np.ndarray], str]],
+                 sample_rate: float = 0.0, queue_size: int = 64, threshold: float = 0.5, keep_examples: int = 20):
+        self._load = load
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._predict = None
+        self.candidate_version: Optional[str] = None
+        self.load_error: Optional[str] = None
+        self.sampled = 0
+        self.dropped = 0
+        self.compared = 0
+        self.disagreements = 0
+        self.errors = 0
+        self._deltas = deque(maxlen=_WINDOW)
+        self._primary_latency = deque(maxlen=_WINDOW)
+        self._candidate_latency = deque(maxlen=_WINDOW)
+        self._examples = deque(maxlen=keep_examples)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="shadow", daemon=True)
+        self._thread.start()
+
+    def submit(self, X: np.ndarray, primary_prob: float, primary_latency: float, primary_version: str) -> None:
+        """Sample a scored input for the candidate; returns immediately."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((X, primary_prob, primary_latency, primary_version))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.sampled += 1
+
+    def _run(self) -> None:
+        while True:
+            X, primary_prob, primary_latency, primary_version = self._queue.get()
+            try:
+                self._compare(X, primary_prob, primary_latency, primary_version)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"[WARN] Shadow evaluation failed: {e}")
+
+    def _compare(self, X: np.ndarray, primary_prob: float, primary_latency: float, primary_version: str) -> None:
+        if self._predict is None:
+            if self.load_error is not None:
+                # A candidate that failed to load is not retried for every sample
+                raise RuntimeError(f"Candidate model unavailable: {self.load_error}")
+            try:
+                self._predict, self.candidate_version = self._load()
+            except Exception as e:
+                self.load_error = str(e)
+                raise
+        start = time.perf_counter()
+        probs = np.asarray(self._predict(X)).reshape(-1)
+        latency = time.perf_counter() - start
+        candidate_prob = float(probs[-1]) if probs.size > 0 else 0.0
+        delta = candidate_prob - primary_prob
+        disagree = (candidate_prob >= self.threshold) != (primary_prob >= self.threshold)
+        with self._lock:
+            self.compared += 1
+            self._deltas.append(abs(delta))
+            self._primary_latency.append(primary_latency)
+            self._candidate_latency.append(latency)
+            if disagree:
+                self.disagreements += 1
+                self._examples.append({"at": time.time(), "seq_len": int(X.shape[1]),
+                                       "primary_version": primary_version, "primary_probability": primary_prob,
+                                       "candidate_probability": candidate_prob})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sample_rate": self.sample_rate,
+                "candidate_version": self.candidate_version,
+                "load_error": self.load_error,
+                "sampled": self.sampled,
+                "dropped": self.dropped,
+                "queued": self._queue.qsize(),
+                "compared": self.compared,
+                "errors": self.errors,
+                "disagreements": self.disagreements,
+                "disagreement_rate": self.disagreements / self.compared if self.compared else None,
+                "abs_delta": _summary(self._deltas),
+                "primary_latency": _summary(self._primary_latency),
+                "candidate_latency": _summary(self._candidate_latency),
+                "recent_disagreements": list(self._examples),
+            }
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from service.incremental import PrefixIndex, SequenceScorer, score_with_prefix_cache
+
+N_FEATURES = 3
+# Resumed recurrences run the same float32 ops in a different order than a full pass
+ATOL = 1e-6
+
+
+@pytest.fixture(scope="module")
+def model():
+    inputs = tf.keras.Input((None, N_FEATURES))
+    x = tf.keras.layers.Masking(-1.0)(inputs)
+    x = tf.keras.layers.LSTM(8, return_sequences=True)(x)
+    x = tf.keras.layers.LSTM(4, return_sequences=True)(x)
+    outputs = tf.keras.layers.Dense(1, activation="sigmoid")(x)
+    return tf.keras.Model(inputs, outputs)
+
+
+@pytest.fixture
+def session():
+    return np.random.default_rng(0).normal(size=(1, 200, N_FEATURES)).astype(np.float32)
+
+
+def _expected(model, X):
+    return model.predict(X, verbose=0).reshape(-1)
+
+
+def _score(model, index, X):
+    return score_with_prefix_cache(model, SequenceScorer.from_model(model), index, X, "v1")
+
+
+def test_extension_resumes_from_saved_states(model, session):
+    scorer = SequenceScorer.from_model(model)
+    index = PrefixIndex(8)
+    score_with_prefix_cache(model, scorer, index, session[:, :120], "v1")
+
+    probs = score_with_prefix_cache(model, scorer, index, session, "v1")
+
+    assert index.stats()["resumed"] == 1
+    assert index.stats()["computed_steps"] == 120 + 80
+    np.testing.assert_allclose(probs, _expected(model, session), atol=ATOL)
+
+
+def test_prefix_of_scored_session_is_sliced(model, session):
+    index = PrefixIndex(8)
+    _score(model, index, session)
+
+    probs = _score(model, index, session[:, :50])
+
+    assert index.stats()["full_hits"] == 1
+    np.testing.assert_allclose(probs, _expected(model, session[:, :50]), atol=ATOL)
+
+
+def test_diverging_session_is_recomputed(model, session):
+    index = PrefixIndex(8)
+    _score(model, index, session)
+    diverging = session[:, :150].copy()
+    diverging[0, 100:] += 1.0
+
+    probs = _score(model, index, diverging)
+
+    assert index.stats()["misses"] == 2
+    np.testing.assert_allclose(probs, _expected(model, diverging), atol=ATOL)
+
+
+def test_last_only_returns_last_step(model, session):
+    index = PrefixIndex(8)
+    _score(model, index, session[:, :100])
+
+    last = score_with_prefix_cache(model, SequenceScorer.from_model(model), index, session, "v1", last_only=True)
+
+    assert last.shape == (1,)
+    np.testing.assert_allclose(last, _expected(model, session)[-1:], atol=ATOL)
+
+
+def test_last_only_miss_is_indexed_for_the_next_poll(model, session):
+    scorer = SequenceScorer.from_model(model)
+    index = PrefixIndex(8)
+    score_with_prefix_cache(model, scorer, index, session[:, :199], "v1", last_only=True)
+
+    last = score_with_prefix_cache(model, scorer, index, session, "v1", last_only=True)
+
+    assert index.stats()["resumed"] == 1
+    assert index.stats()["computed_steps"] == 199 + 1
+    np.testing.assert_allclose(last, _expected(model, session)[-1:], atol=ATOL)
@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+import tensorflow as tf
+
+import score_sessions
+from service.feature_store import FeatureStore
+
+FEATURES = ["a", "b", "c"]
+
+
+def _tiny_model(path):
+    inputs = tf.keras.Input((None, len(FEATURES)))
+    x = tf.keras.layers.Masking(-1.0)(inputs)
+    x = tf.keras.layers.LSTM(4, return_sequences=True)(x)
+    outputs = tf.keras.layers.Dense(1, activation="sigmoid")(x)
+    model = tf.keras.Model(inputs, outputs)
+    model.save(path)
+    return model
+
+
+def test_score_sessions_from_store(tmp_path):
+    model = _tiny_model(str(tmp_path / "model.keras"))
+    rng = np.random.default_rng(0)
+    sessions = [(f"s{i}", rng.normal(size=(length, len(FEATURES))).astype(np.float32))
+                for i, length in enumerate([3, 7, 7, 2, 5])]
+    store = FeatureStore.create(str(tmp_path / "store"), FEATURES)
+    store.append(sessions)
+
+    output = tmp_path / "scores.jsonl"
+    code = score_sessions.main(["--store", str(tmp_path / "store"), "--model", str(tmp_path / "model.keras"),
+                                "--output", str(output), "--workers", "2", "--batch-size", "2",
+                                "--include-sequence"])
+
+    assert code == 0
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row["key"] for row in rows] == [key for key, _ in sessions]
+    for row, (_, values) in zip(rows, sessions):
+        expected = model.predict(values[np.newaxis], verbose=0).reshape(-1)
+        np.testing.assert_allclose(row["sequence_probabilities"], expected, atol=1e-5)
+        assert row["last_probability"] == row["sequence_probabilities"][-1]